@@ -4,11 +4,18 @@ Make sure to set the API key in the `my_agent/.env` file. See `README.md` for mo
 """
 
 import argparse
+import concurrent.futures
 import datetime
+import decimal
+import functools
+import hashlib
 import json
 import os
 import pathlib
+import re
+import sys
 import time
+import unicodedata
 
 import dotenv
 import pydantic
@@ -16,7 +23,7 @@ from google import genai
 from colorama import Fore, Style, init
 import pyfiglet
 
-from utils import server
+from utils import cache, dataset, ratelimit, server, stats, usage
 
 # Initialize colorama for cross-platform color support
 init(autoreset=True)
@@ -42,6 +49,35 @@ else:
 DATASET_PATH = "benchmark/train.json"
 ATTACHMENTS_FOLDER_PATH = "benchmark/attachments"
 
+JUDGE_MODEL = "gemini-2.5-flash-lite"
+JUDGE_PROMPT = """
+    You are an evaluation judge.
+    Determine if the agent's response is semantically completely equivalent to the expected answer.
+
+Question: {question}
+
+Expected Answer: {expected_answer}
+
+Agent's Response: {response}
+
+Evaluate whether the agent's response is semantically equivalent to the expected answer, even if worded differently.
+Be strict but fair - minor variations in wording are acceptable if the core answer is correct.
+"""
+
+# Questions judged concurrently with the following questions' agent runs
+JUDGE_WORKERS = int(os.getenv("JUDGE_WORKERS", "4"))
+
+# Numbers, with optional thousands separators ("1,000") and decimals
+NUMBER_PATTERN = re.compile(r"-?\d{1,3}(?:,\d{3})+(?:\.\d+)?|-?\d+(?:\.\d+)?|-?(?<![\w.])\.\d+")
+# Only a leading article before a word is dropped ("The Eiffel Tower"); elsewhere, or before a
+# single letter, it can be the answer ("Vitamin A", "a b")
+LEADING_ARTICLE_PATTERN = re.compile(r"^(?:a|an|the)\s+(?=[^\W\d_]{2})")
+# Answers listing items ("A, C"), where a leading "a" is an item, not an article
+LIST_SEPARATORS = ",;"
+# Symbols that change the meaning of an answer ("5%" is not "5", "C++" is not "C"), kept as
+# separate tokens
+SIGNIFICANT_SYMBOLS = "%°+#"
+
 
 def print_banner():
     """Print the ML6 banner."""
@@ -56,21 +92,14 @@ def print_banner():
     print(f"{orange}{'=' * 80}{Style.RESET_ALL}\n")
 
 
-def _load_dataset():
-    """Load the train dataset."""
-    dataset_path = DATASET_PATH
-
-    try:
-        with open(dataset_path, "r") as f:
-            data = json.load(f)
-            # Handle both array format and dict with "dataset" key
-            if isinstance(data, dict) and "dataset" in data:
-                return data["dataset"]
-            return data
-    except FileNotFoundError:
-        raise FileNotFoundError(f"Dataset file not found: {dataset_path}")
-    except json.JSONDecodeError as e:
-        raise ValueError(f"Invalid JSON in dataset file: {e}")
+def _load_question(dataset_path: str, question_idx: int) -> dict:
+    """Read one question of the dataset by its index."""
+    count = 0
+    for idx, question_data in dataset.iter_dataset(dataset_path):
+        if idx == question_idx:
+            return question_data
+        count = idx + 1
+    raise ValueError(f"Question index {question_idx} out of range (0-{count - 1})")
 
 
 def string_match(response: str, expected_answer: str) -> bool:
@@ -85,6 +114,91 @@ def string_match(response: str, expected_answer: str) -> bool:
     return False
 
 
+def _symbol(match: re.Match) -> str:
+    symbol = match.group()
+    if symbol in SIGNIFICANT_SYMBOLS or unicodedata.category(symbol) == "Sc":  # Sc: currency signs
+        return f" {symbol} "
+    return " "
+
+
+def _hyphen(match: re.Match) -> str:
+    # A trailing minus is significant ("A-" is not "A"); other hyphens separate words
+    return " - " if match.group(1) else " "
+
+
+def _canonical_number(match: re.Match) -> str:
+    try:
+        number = decimal.Decimal(match.group().replace(",", "")).normalize()
+    except decimal.InvalidOperation:
+        return match.group()
+    return format(number, "f")
+
+
+def normalize_answer(text: str) -> str:
+    """
+    Normalize an answer for matching: unicode forms, case, number formatting
+    ("1,000.50" → "1000.5", ".5" → "0.5"), punctuation except significant symbols (units,
+    currency signs, "+", "#", a trailing "-"), and a leading article unless the answer is a list.
+    """
+    text = unicodedata.normalize("NFKC", text).lower()
+    text = NUMBER_PATTERN.sub(_canonical_number, text)
+    is_list = any(separator in text for separator in LIST_SEPARATORS)
+    # Keep decimal points and minus signs of numbers; abbreviation dots go ("U.S." → "us"),
+    # all other punctuation separates words
+    text = re.sub(r"(?<!\d)\.|\.(?!\d)", "", text)
+    text = re.sub(r"(?<=\w)(-)(?![\w-])|-(?!\d)|(?<=\w)-", _hyphen, text)
+    text = re.sub(r"[^\w\s.\-]", _symbol, text)
+    text = " ".join(text.split())
+    return text if is_list else LEADING_ARTICLE_PATTERN.sub("", text)
+
+
+def normalized_match(response: str, expected_answer: str) -> bool:
+    """Check if response and expected answer are equal after `normalize_answer`."""
+    normalized = normalize_answer(response)
+    return bool(normalized) and normalized == normalize_answer(expected_answer)
+
+
+# (response, expected answer, whether they should match) pairs checked by --check-normalizer;
+# every wrong answer the normalizer ever accepted belongs here
+NORMALIZER_CASES = [
+    ("The Eiffel Tower.", "Eiffel Tower", True),
+    ("An apple", "apple", True),
+    ("1,000.50", "1000.5", True),
+    ("0.5", ".5", True),
+    ("-.5", "-0.5", True),
+    ("U.S.", "US", True),
+    ("5 %", "5%", True),
+    ("$1,000", "$1000", True),
+    ("25°C", "25 °C", True),
+    ("C++", "c++", True),
+    ("well-known", "well known", True),
+    ("Paris, France", "Paris France", True),
+    ("A, C", "a,c", True),
+    ("Vitamin A", "Vitamin", False),
+    ("Over the Moon", "Over Moon", False),
+    (".5", "5", False),
+    ("5", "-5", False),
+    ("5%", "5", False),
+    ("€5", "5", False),
+    ("25°C", "25C", False),
+    ("A, C", "C", False),
+    ("a, b", "b", False),
+    ("a b", "b", False),
+    ("C++", "C", False),
+    ("C#", "C", False),
+    ("F#", "F", False),
+    ("A+", "A", False),
+    ("5+", "5", False),
+    ("A-", "A", False),
+    ("a", "", False),
+]
+
+
+def check_normalizer() -> list[tuple[str, str, bool]]:
+    """Return the `NORMALIZER_CASES` that `normalized_match` gets wrong."""
+    return [case for case in NORMALIZER_CASES if normalized_match(case[0], case[1]) != case[2]]
+
+
 def llm_judge(response: str, expected_answer: str, question: str) -> bool:
     """
     Use LLM as a judge to determine if the response is correct.
@@ -94,23 +208,13 @@ def llm_judge(response: str, expected_answer: str, question: str) -> bool:
         raise ValueError("GOOGLE_API_KEY not set")
     if response is None or response.strip() == "":
         return False
-    prompt = f"""
-    You are an evaluation judge.
-    Determine if the agent's response is semantically completely equivalent to the expected answer.
-
-Question: {question}
-
-Expected Answer: {expected_answer}
-
-Agent's Response: {response}
-
-Evaluate whether the agent's response is semantically equivalent to the expected answer, even if worded differently.
-Be strict but fair - minor variations in wording are acceptable if the core answer is correct.
-"""
+    prompt = JUDGE_PROMPT.format(question=question, expected_answer=expected_answer, response=response)
 
     try:
-        llm_response = client.models.generate_content(
-            model="gemini-2.5-flash-lite",
+        llm_response = ratelimit.call(
+            JUDGE_MODEL,
+            client.models.generate_content,
+            model=JUDGE_MODEL,
             contents=prompt,
             config={
                 "response_mime_type": "application/json",
@@ -118,6 +222,7 @@ Be strict but fair - minor variations in wording are acceptable if the core answ
             },
         )
 
+        usage.record(llm_response, JUDGE_MODEL, "llm_judge")
         result: JudgeResponse = llm_response.parsed
         return result.is_correct
     except Exception as e:
@@ -125,34 +230,65 @@ Be strict but fair - minor variations in wording are acceptable if the core answ
         raise e
 
 
-def evaluate_single_question(question_data: dict, question_idx: int) -> dict:
+@functools.lru_cache(maxsize=None)
+def _judge_cache() -> cache.PersistentCache | None:
+    """Persistent cache of judge verdicts (disable with JUDGE_CACHE=0)."""
+    if os.getenv("JUDGE_CACHE", "1") != "1":
+        return None
+    return cache.PersistentCache(os.path.join(cache.CACHE_DIR, "judge.sqlite3"))
+
+
+def _judge_namespace() -> str:
+    # Verdicts are scoped to the judge model and prompt, so changing either invalidates them
+    return f"{JUDGE_MODEL}:{hashlib.sha256(JUDGE_PROMPT.encode('utf-8')).hexdigest()[:16]}"
+
+
+def cached_llm_judge(response: str, expected_answer: str, question: str) -> tuple[bool, bool]:
     """
-    Evaluate a single question.
+    `llm_judge` behind the persistent verdict cache.
+
+    Returns:
+        Tuple of (is correct, whether the verdict came from the cache)
+    """
+    judge_cache = _judge_cache()
+    key = cache.judge_key(question, expected_answer, response or "", namespace=_judge_namespace())
+    if judge_cache is not None:
+        verdict = judge_cache.get(key)
+        if verdict is not None:
+            return verdict, True
+
+    is_correct = llm_judge(response, expected_answer, question)
+    if judge_cache is not None:
+        judge_cache.set(key, is_correct)
+    return is_correct, False
+
+
+def _tool_output_sizes(state: dict) -> dict:
+    """Per-tool call count and output size before/after the tool output policy, from run state."""
+    sizes = {}
+    for key, value in state.items():
+        if key.startswith("compaction:"):
+            tool = sizes.setdefault(value["tool"], {"calls": 0, "original_chars": 0, "returned_chars": 0})
+            tool["calls"] += 1
+            tool["original_chars"] += value["original_chars"]
+            tool["returned_chars"] += value["returned_chars"]
+    return sizes
+
+
+def _run_question(question_data: dict, question_idx: int, use_cache: bool = True) -> dict:
+    """
+    Run the agent on a single question, without judging the answer.
 
     Args:
         question_data: Dict containing question, answer, and optional file_name
         question_idx: Index of the question in the dataset
+        use_cache: Allow answers to be served from the answer cache
 
     Returns:
-        Dict with evaluation results
+        Dict with evaluation results, with `correct` and `method` still None
     """
-    # Extract question and answer based on dataset format
-    if "Question" in question_data:  # verbose format
-        question = question_data["Question"]
-        expected_answer = question_data["Final answer"]
-        file_name = question_data.get("file_name", "")
-    else:  # simple format
-        question = question_data["question"]
-        expected_answer = question_data["answer"]
-        file_name = question_data.get("file_name", "")
-
-    # Prepare file paths if files are provided
-    file_paths = None
-    if file_name:
-        # Handle comma-separated file names
-        files = [f.strip() for f in file_name.split(",") if f.strip()]
-        if files:
-            file_paths = [f"{ATTACHMENTS_FOLDER_PATH}/{f}" for f in files]
+    # Extract question, answer and attachment paths based on dataset format
+    question, expected_answer, file_paths = dataset.unpack_question(question_data, ATTACHMENTS_FOLDER_PATH)
 
     print(f"\n{Fore.CYAN}{'=' * 80}")
     print(f"{Fore.CYAN}{Style.BRIGHT}Question {question_idx + 1}")
@@ -166,120 +302,352 @@ def evaluate_single_question(question_data: dict, question_idx: int) -> dict:
     user_id = os.getenv("USER_ID", "dev_user")
     try:
         start_time = time.time()
-        agent_response = server.run_agent(question, file_paths, user_id=user_id)
+        agent_run = server.run(question, file_paths, user_id=user_id, use_cache=use_cache)
+        agent_response = agent_run.text
         end_time = time.time()
         response_time = end_time - start_time
 
         print(f"\n{Fore.WHITE}Agent Response:{Style.RESET_ALL} {agent_response}")
         print(f"{Fore.YELLOW}Expected Answer:{Style.RESET_ALL} {expected_answer}")
-        print(f"{Fore.MAGENTA}Response Time:{Style.RESET_ALL} {response_time:.2f}s")
+        print(f"{Fore.MAGENTA}Response Time:{Style.RESET_ALL} {response_time:.2f}s"
+              + (" (cached)" if agent_run.cached else "")
+              + (f" {Fore.RED}(timed out){Style.RESET_ALL}" if agent_run.timed_out else ""))
+        if agent_run.trace_file:
+            print(f"{Fore.MAGENTA}Trace:{Style.RESET_ALL} {agent_run.trace_file}")
     except Exception as e:
         print(f"{Fore.RED}Error running agent: {e}{Style.RESET_ALL}")
         raise e
 
-    # First try string matching
-    string_matches = string_match(agent_response, expected_answer)
-
-    if string_matches:
-        print(f"{Fore.GREEN}{Style.BRIGHT}✓ Correct (string match){Style.RESET_ALL}")
-        return {
-            "question_idx": question_idx,
-            "question": question,
-            "expected_answer": expected_answer,
-            "agent_response": agent_response,
-            "correct": True,
-            "method": "string_match",
-            "response_time": response_time,
-        }
+    # Token usage of the run (a cached answer costs nothing)
+    usage_records = [] if agent_run.cached else usage.run_records(agent_run.events, agent_run.state)
+
+    return {
+        "question_idx": question_idx,
+        "question": question,
+        "expected_answer": expected_answer,
+        "agent_response": agent_response,
+        "correct": None,
+        "method": None,
+        "response_time": response_time,
+        "routing": agent_run.state.get("routing"),
+        "cached": agent_run.cached,
+        "cascade": agent_run.state.get("cascade"),
+        "usage": usage.summarize(usage_records),
+        "tool_output": _tool_output_sizes(agent_run.state),
+        "trace": agent_run.trace_file,
+        "attachments": file_paths or [],
+        "timed_out": agent_run.timed_out,
+        "prefetch": agent_run.state.get("prefetch"),
+    }
+
+
+def _judge_result(result: dict) -> dict:
+    """
+    Judge the agent's answer of a `_run_question` result: string match, then normalized
+    match, then the (cached) LLM judge. Safe to run in a thread while the next question runs.
+
+    Returns:
+        The result with `correct` and `method` set and the judge's token usage added. If the
+        LLM judge fails, the question is recorded as incorrect with method "unjudged" and the
+        error under `judge_error`, so one failed call does not lose the other results.
+    """
+    agent_response = result["agent_response"]
+    expected_answer = result["expected_answer"]
+    label = f"Question {result['question_idx'] + 1}:"
+
+    if string_match(agent_response, expected_answer):
+        print(f"{Fore.GREEN}{Style.BRIGHT}{label} ✓ Correct (string match){Style.RESET_ALL}")
+        return {**result, "correct": True, "method": "string_match"}
+
+    if normalized_match(agent_response, expected_answer):
+        print(f"{Fore.GREEN}{Style.BRIGHT}{label} ✓ Correct (normalized match){Style.RESET_ALL}")
+        return {**result, "correct": True, "method": "normalized_match"}
 
     # Fall back to LLM judge
-    print(f"\n{Fore.YELLOW}String match failed, using LLM judge...{Style.RESET_ALL}")
-    is_correct = llm_judge(agent_response, expected_answer, question)
+    try:
+        with usage.collect() as judge_records:
+            is_correct, cached = cached_llm_judge(agent_response, expected_answer, result["question"])
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+        print(f"{Fore.RED}{Style.BRIGHT}{label} ✗ Not judged, counted as incorrect ({error}){Style.RESET_ALL}")
+        return {**result, "correct": False, "method": "unjudged", "judge_error": error}
+    judge_usage = usage.summarize([{**r, "agent": "evaluator", "tool": "llm_judge"} for r in judge_records])
+    method = "llm_judge_cached" if cached else "llm_judge"
 
     if is_correct:
-        print(f"{Fore.GREEN}{Style.BRIGHT}✓ Correct (LLM judge){Style.RESET_ALL}")
+        print(f"{Fore.GREEN}{Style.BRIGHT}{label} ✓ Correct (LLM judge{', cached' if cached else ''}){Style.RESET_ALL}")
     else:
-        print(f"{Fore.RED}{Style.BRIGHT}✗ Incorrect{Style.RESET_ALL}")
+        print(f"{Fore.RED}{Style.BRIGHT}{label} ✗ Incorrect{Style.RESET_ALL}")
 
     return {
-        "question_idx": question_idx,
-        "question": question,
-        "expected_answer": expected_answer,
-        "agent_response": agent_response,
+        **result,
         "correct": is_correct,
-        "method": "llm_judge",
-        "response_time": response_time,
+        "method": method,
+        "usage": usage.merge([result["usage"], judge_usage]) if judge_records else result["usage"],
     }
 
 
-def evaluate_all(dataset_path=None, output_file=None) -> dict:
+def evaluate_single_question(question_data: dict, question_idx: int, use_cache: bool = True) -> dict:
     """
-    Evaluate all questions in the dataset.
+    Evaluate a single question.
+
+    Args:
+        question_data: Dict containing question, answer, and optional file_name
+        question_idx: Index of the question in the dataset
+        use_cache: Allow answers to be served from the answer cache
 
     Returns:
-        Dict with aggregated results
+        Dict with evaluation results
     """
-    # Print the banner
-    print_banner()
+    return _judge_result(_run_question(question_data, question_idx, use_cache=use_cache))
 
-    dataset = _load_dataset()
 
-    results = []
-    correct_count = 0
-    total_count = len(dataset)
+def evaluate_question_repeatedly(question_data: dict, question_idx: int, repeat: int) -> dict:
+    """
+    Evaluate a question `repeat` times, bypassing the answer cache, to measure its latency distribution.
 
-    print(
-        f"{Fore.CYAN}{Style.BRIGHT}Starting evaluation of {total_count} questions...{Style.RESET_ALL}"
-    )
-    print(f"{Fore.CYAN}{'=' * 80}{Style.RESET_ALL}")
+    Args:
+        question_data: Dict containing question, answer, and optional file_name
+        question_idx: Index of the question in the dataset
+        repeat: Number of runs
 
-    for idx, question_data in enumerate(dataset):
-        result = evaluate_single_question(question_data, idx)
-        results.append(result)
+    Returns:
+        Result of the first run, with the median response time over all runs, the majority
+        verdict as `correct`, every run's outcome under `runs` and the latency distribution
+        under `latency`
+    """
+    runs = [evaluate_single_question(question_data, question_idx, use_cache=False) for _ in range(repeat)]
+    response_times = [r["response_time"] for r in runs]
 
-        if result["correct"]:
-            correct_count += 1
+    result = dict(runs[0])
+    result["response_time"] = stats.median(response_times)
+    result["correct"] = sum(r["correct"] for r in runs) * 2 > repeat
+    result["runs"] = [
+        {key: r[key] for key in ("agent_response", "correct", "response_time", "timed_out")} for r in runs
+    ]
+    result["latency"] = stats.distribution(response_times)
+    return result
+
+
+def _cascade_summary(results: list[dict]) -> dict:
+    """
+    Group results by the cascade tier (model) that produced the final answer.
+
+    Returns:
+        Dict mapping model name to question count, accuracy, average response time,
+        and the average latency of each attempted tier on those questions
+    """
+    tiers = {}
+    for r in results:
+        cascade = r.get("cascade")
+        if not cascade:
+            continue
+        tier = tiers.setdefault(cascade["model"], {"questions": 0, "correct": 0, "response_times": [], "attempts": {}})
+        tier["questions"] += 1
+        tier["correct"] += r["correct"]
+        if not r.get("cached"):
+            tier["response_times"].append(r["response_time"])
+        for attempt in cascade.get("attempts", []):
+            tier["attempts"].setdefault(attempt["model"], []).append(attempt["latency"])
+
+    return {
+        model: {
+            "questions": tier["questions"],
+            "accuracy": round(tier["correct"] / tier["questions"] * 100, 2),
+            "average_response_time": round(
+                sum(tier["response_times"]) / len(tier["response_times"]), 2) if tier["response_times"] else 0,
+            "average_tier_latency": {
+                attempt_model: round(sum(latencies) / len(latencies), 2)
+                for attempt_model, latencies in tier["attempts"].items()
+            },
+        }
+        for model, tier in tiers.items()
+    }
+
+
+def summarize_results(results: list[dict], cache_summary: dict | None = None,
+                      server_samples: list[dict] | None = None) -> dict:
+    """
+    Aggregate per-question results into the evaluation summary. Everything is recomputed
+    from the results, so it also gives correct statistics for merged shard results.
+
+    Args:
+        results: Per-question results, as returned by `evaluate_single_question`
+        cache_summary: Answer cache hit/miss counters, if the cache was used
+        server_samples: Server session count and memory, sampled after each question
+
+    Returns:
+        Dict with aggregated results (including the per-question results)
+    """
+    server_samples = server_samples or []
+    total_count = len(results)
+    correct_count = sum(1 for r in results if r["correct"])
 
     # Calculate accuracy
     accuracy = (correct_count / total_count) * 100 if total_count > 0 else 0
 
-    # Calculate timing statistics
-    response_times = [r["response_time"] for r in results]
+    # Calculate timing statistics; answers served from the answer cache took no agent time, so
+    # they would only drag the averages towards zero
+    timed_results = [r for r in results if not r.get("cached")]
+    response_times = [r["response_time"] for r in timed_results]
     avg_response_time = sum(response_times) / len(response_times) if response_times else 0
 
     # Calculate metrics for correct answers only
-    correct_response_times = [r["response_time"] for r in results if r["correct"]]
+    correct_response_times = [r["response_time"] for r in timed_results if r["correct"]]
     avg_correct_response_time = sum(correct_response_times) / len(correct_response_times) if correct_response_times else 0
 
-    # Prepare summary
-    summary = {
+    # Calculate routing statistics (local router vs LLM router)
+    routings = [r["routing"] for r in results if r.get("routing")]
+    routing_latencies = [r["latency_ms"] for r in routings]
+    routing_summary = {
+        "local": sum(1 for r in routings if r["method"] == "local"),
+        "llm": sum(1 for r in routings if r["method"] == "llm"),
+        "average_latency_ms": round(sum(routing_latencies) / len(routing_latencies), 3) if routing_latencies else 0,
+    }
+
+    cascade_summary = _cascade_summary(results)
+
+    # How answers were judged (string match, normalized match, LLM judge, cached verdict)
+    judging_summary = {}
+    for r in results:
+        method = r.get("method", "unknown")
+        judging_summary[method] = judging_summary.get(method, 0) + 1
+
+    # Token usage totals, per agent/tool breakdown and per-question distribution (results files
+    # written before usage was recorded count as no usage)
+    question_usage = [r.get("usage") or usage.summarize([]) for r in results]
+    usage_summary = usage.merge(question_usage)
+    usage_summary["per_question_total_tokens"] = stats.distribution(
+        [u["total"]["total_tokens"] for u in question_usage], digits=0)
+    usage_summary["per_question_prompt_tokens"] = stats.distribution(
+        [u["total"]["prompt_tokens"] for u in question_usage], digits=0)
+
+    # Tool output sizes before and after the output policy
+    tool_output_summary = {}
+    for r in results:
+        for tool, sizes in r.get("tool_output", {}).items():
+            total = tool_output_summary.setdefault(tool, {"calls": 0, "original_chars": 0, "returned_chars": 0})
+            for field in total:
+                total[field] += sizes[field]
+
+    # Questions with attachments, to compare response times with and without prefetch
+    with_attachments = [r for r in results if r.get("attachments")]
+    prefetch_latencies = [r["prefetch"]["latency"] for r in with_attachments if r.get("prefetch")]
+    timed_attachments = [r["response_time"] for r in with_attachments if not r.get("cached")]
+    attachment_summary = {
+        "questions": len(with_attachments),
+        "average_response_time": round(
+            sum(timed_attachments) / len(timed_attachments), 2) if timed_attachments else 0,
+        "prefetched": len(prefetch_latencies),
+        "average_prefetch_latency": round(
+            sum(prefetch_latencies) / len(prefetch_latencies), 3) if prefetch_latencies else 0,
+    }
+
+    timing_summary = {
+        "average_response_time": round(avg_response_time, 2),
+        "average_correct_response_time": round(avg_correct_response_time, 2),
+        "timed_questions": len(timed_results),
+    }
+    # With --repeat, the latency distribution over every run of every question
+    run_times = [run["response_time"] for r in results for run in r.get("runs", [])]
+    if run_times:
+        timing_summary["all_runs"] = stats.distribution(run_times)
+
+    return {
         "timestamp": datetime.datetime.now().isoformat(),
         "total_questions": total_count,
         "correct": correct_count,
         "incorrect": total_count - correct_count,
+        "timed_out": sum(1 for r in results if r.get("timed_out")),
         "accuracy": round(accuracy, 2),
-        "timing": {
-            "average_response_time": round(avg_response_time, 2),
-            "average_correct_response_time": round(avg_correct_response_time, 2),
+        "timing": timing_summary,
+        "routing": routing_summary,
+        "cache": cache_summary,
+        "cascade": cascade_summary,
+        "judging": judging_summary,
+        "usage": usage_summary,
+        "tool_output": tool_output_summary,
+        "attachments": attachment_summary,
+        "server": {
+            "final": server_samples[-1] if server_samples else None,
+            "samples": server_samples,
         },
         "results": results,
     }
 
-    # Print summary
+
+def print_summary(summary: dict):
+    """Print the evaluation summary."""
+    timing = summary["timing"]
+    routing_summary = summary["routing"]
+    cache_summary = summary["cache"]
+    usage_summary = summary["usage"]
+    attachment_summary = summary["attachments"]
+    server_samples = summary["server"]["samples"]
+
     print(f"\n{Fore.CYAN}{Style.BRIGHT}{'=' * 80}")
     print("EVALUATION SUMMARY")
     print(f"{'=' * 80}{Style.RESET_ALL}")
     print(f"\n{Fore.WHITE}{Style.BRIGHT}Correctness Metrics:{Style.RESET_ALL}")
-    print(f"{Fore.WHITE}Total Questions:{Style.RESET_ALL} {total_count}")
-    print(f"{Fore.GREEN}Correct:{Style.RESET_ALL} {correct_count}")
-    print(f"{Fore.RED}Incorrect:{Style.RESET_ALL} {total_count - correct_count}")
-    print(f"{Fore.CYAN}{Style.BRIGHT}Accuracy:{Style.RESET_ALL} {accuracy:.2f}%")
+    print(f"{Fore.WHITE}Total Questions:{Style.RESET_ALL} {summary['total_questions']}")
+    print(f"{Fore.GREEN}Correct:{Style.RESET_ALL} {summary['correct']}")
+    print(f"{Fore.RED}Incorrect:{Style.RESET_ALL} {summary['incorrect']}")
+    if summary["timed_out"]:
+        print(f"{Fore.RED}Timed Out:{Style.RESET_ALL} {summary['timed_out']}")
+    print(f"{Fore.CYAN}{Style.BRIGHT}Accuracy:{Style.RESET_ALL} {summary['accuracy']:.2f}%")
     print(f"\n{Fore.WHITE}{Style.BRIGHT}Timing Metrics:{Style.RESET_ALL}")
-    print(f"{Fore.MAGENTA}Average Response Time (All):{Style.RESET_ALL} {avg_response_time:.2f}s")
-    print(f"{Fore.GREEN}Average Response Time (Correct Only):{Style.RESET_ALL} {avg_correct_response_time:.2f}s")
+    print(f"{Fore.MAGENTA}Average Response Time (All):{Style.RESET_ALL} {timing['average_response_time']:.2f}s")
+    cached_count = summary["total_questions"] - timing.get("timed_questions", summary["total_questions"])
+    if cached_count:
+        print(f"{Fore.YELLOW}  ({cached_count} cached answers excluded from response times;"
+              f" use --no-cache to time every question){Style.RESET_ALL}")
+    print(f"{Fore.GREEN}Average Response Time (Correct Only):{Style.RESET_ALL} {timing['average_correct_response_time']:.2f}s")
+    if "all_runs" in timing:
+        print(f"{Fore.MAGENTA}Response Time over All Runs:{Style.RESET_ALL} p50 {timing['all_runs']['p50']:.2f}s,"
+              f" p90 {timing['all_runs']['p90']:.2f}s, p99 {timing['all_runs']['p99']:.2f}s")
+    if attachment_summary["questions"]:
+        print(f"{Fore.MAGENTA}Average Response Time (With Attachments):{Style.RESET_ALL}"
+              f" {attachment_summary['average_response_time']:.2f}s over {attachment_summary['questions']} questions"
+              + (f" ({attachment_summary['prefetched']} prefetched,"
+                 f" {attachment_summary['average_prefetch_latency']:.2f}s average extraction)"
+                 if attachment_summary["prefetched"] else ""))
+    if routing_summary["local"] or routing_summary["llm"]:
+        print(f"{Fore.MAGENTA}Routing (local / LLM):{Style.RESET_ALL} {routing_summary['local']} / {routing_summary['llm']}"
+              f" (avg local decision {routing_summary['average_latency_ms']:.3f} ms)")
+    for model, tier in summary["cascade"].items():
+        print(f"{Fore.MAGENTA}Cascade tier {model}:{Style.RESET_ALL} {tier['questions']} questions,"
+              f" {tier['accuracy']:.2f}% accuracy, {tier['average_response_time']:.2f}s average")
+    if summary.get("judging"):
+        print(f"{Fore.MAGENTA}Judged by:{Style.RESET_ALL} "
+              + ", ".join(f"{method} {count}" for method, count in sorted(summary["judging"].items())))
+        if summary["judging"].get("unjudged"):
+            print(f"{Fore.YELLOW}  ({summary['judging']['unjudged']} answers could not be judged and count as"
+                  f" incorrect; see judge_error in the results){Style.RESET_ALL}")
+    if cache_summary:
+        print(f"{Fore.MAGENTA}Answer Cache Hit Rate:{Style.RESET_ALL} {cache_summary['hit_rate'] * 100:.1f}%"
+              f" ({cache_summary['hits']} hits, {cache_summary['misses']} misses)")
+    print(f"\n{Fore.WHITE}{Style.BRIGHT}Token Usage:{Style.RESET_ALL}")
+    print(f"{Fore.MAGENTA}Total Tokens:{Style.RESET_ALL} {usage_summary['total']['total_tokens']}"
+          f" ({usage_summary['calls']} model calls)")
+    per_question = usage_summary["per_question_total_tokens"]
+    print(f"{Fore.MAGENTA}Tokens per Question:{Style.RESET_ALL} p50 {per_question['p50']:.0f},"
+          f" p90 {per_question['p90']:.0f}, max {per_question['max']:.0f}")
+    for group in ("by_agent", "by_tool"):
+        for name, tokens in sorted(usage_summary[group].items(), key=lambda item: -item[1]["total_tokens"]):
+            print(f"  {name}: {tokens['total_tokens']} tokens ({tokens['prompt_tokens']} prompt)")
+    for tool, sizes in sorted(summary["tool_output"].items()):
+        print(f"  {tool} output: {sizes['original_chars']} → {sizes['returned_chars']} chars over {sizes['calls']} calls")
+    if server_samples:
+        first, last = server_samples[0], server_samples[-1]
+        print(f"\n{Fore.WHITE}{Style.BRIGHT}Server Metrics:{Style.RESET_ALL}")
+        print(f"{Fore.MAGENTA}Sessions (first → last):{Style.RESET_ALL} {first['sessions']} → {last['sessions']}")
+        if last["rss_mb"] is not None:
+            print(f"{Fore.MAGENTA}Server Memory (first → last):{Style.RESET_ALL} {first['rss_mb']} MB → {last['rss_mb']} MB")
     print(f"{Fore.CYAN}{'=' * 80}{Style.RESET_ALL}")
 
-    # Save results to file
+
+def _save_results(summary: dict, output_file: str | None) -> str:
+    """Write the summary to `output_file` (default: evaluation_results_<timestamp>.json)."""
     if output_file is None:
         output_file = f"evaluation_results_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
 
@@ -290,9 +658,294 @@ def evaluate_all(dataset_path=None, output_file=None) -> dict:
     except IOError as e:
         raise IOError(f"Failed to write results to {output_file}: {e}")
 
+    return output_file
+
+
+def evaluate_all(dataset_path=None, output_file=None, use_cache: bool = True,
+                 shard: tuple[int, int] | None = None, repeat: int = 1) -> dict:
+    """
+    Evaluate all questions in the dataset, or those of one shard.
+
+    Args:
+        dataset_path: Dataset file, JSON or JSONL (default: DATASET_PATH)
+        output_file: Path of the results file
+        use_cache: Allow answers to be served from the answer cache
+        shard: (i, n) to evaluate only shard i of n (every n-th question, starting at question i)
+        repeat: Number of runs per question (more than 1 bypasses the answer cache)
+
+    Returns:
+        Dict with aggregated results
+    """
+    # Print the banner
+    print_banner()
+
+    dataset_path = dataset_path or DATASET_PATH
+    shard_label = f"{shard[0]}/{shard[1]}" if shard else None
+
+    print(
+        f"{Fore.CYAN}{Style.BRIGHT}Starting evaluation of {dataset_path}"
+        f"{f' (shard {shard_label})' if shard else ''}...{Style.RESET_ALL}"
+    )
+    print(f"{Fore.CYAN}{'=' * 80}{Style.RESET_ALL}")
+
+    if repeat > 1 and use_cache:
+        print(f"{Fore.YELLOW}Running each question {repeat} times; the answer cache is bypassed.{Style.RESET_ALL}")
+        use_cache = False
+
+    user_id = os.getenv("USER_ID", "dev_user")
+    results = []
+    server_samples = []
+
+    # Answers are judged in the background while the agent runs the next questions
+    with concurrent.futures.ThreadPoolExecutor(max_workers=JUDGE_WORKERS) as judges:
+        # Questions are streamed from the dataset file, so large datasets are never loaded at once
+        for idx, question_data in dataset.iter_dataset(dataset_path):
+            if not dataset.in_shard(idx, shard):
+                continue
+
+            if repeat > 1:
+                # Repeated runs are judged inline, so they do not compete with the timed runs
+                result = concurrent.futures.Future()
+                result.set_result(evaluate_question_repeatedly(question_data, idx, repeat))
+            else:
+                result = judges.submit(_judge_result, _run_question(question_data, idx, use_cache=use_cache))
+            results.append(result)
+
+            # Sample server-side session count and memory so long runs can be checked for growth
+            server_samples.append({"question_idx": idx, **server.server_stats(user_id=user_id)})
+
+        results = [future.result() for future in results]
+
+    cache_summary = server.cache_stats(user_id=user_id) if use_cache else None
+
+    summary = summarize_results(results, cache_summary=cache_summary, server_samples=server_samples)
+    summary["dataset"] = dataset_path
+    summary["shard"] = shard_label
+    summary["repeat"] = repeat
+
+    print_summary(summary)
+    _save_results(summary, output_file)
+
+    return summary
+
+
+def merge_results(result_files: list[str], output_file: str | None = None) -> dict:
+    """
+    Merge the results files of several shards into one summary.
+
+    Accuracy, latency and usage statistics are recomputed over all questions; answer cache
+    counters are added up; server samples are kept per shard, as they come from different servers.
+
+    Args:
+        result_files: Results files written by `evaluate_all`
+        output_file: Path of the merged results file
+
+    Returns:
+        Dict with aggregated results over all shards
+
+    Raises:
+        ValueError: If a question appears in more than one file
+    """
+    results_by_idx = {}
+    cache_counts = {"hits": 0, "misses": 0}
+    use_cache = False
+    shards = []
+    for result_file in result_files:
+        with open(result_file, "r") as f:
+            shard_summary = json.load(f)
+
+        for r in shard_summary["results"]:
+            if r["question_idx"] in results_by_idx:
+                raise ValueError(f"Question {r['question_idx']} appears in more than one results file ({result_file})")
+            results_by_idx[r["question_idx"]] = r
+
+        if shard_summary.get("cache"):
+            use_cache = True
+            cache_counts["hits"] += shard_summary["cache"]["hits"]
+            cache_counts["misses"] += shard_summary["cache"]["misses"]
+
+        shards.append({
+            "file": result_file,
+            "shard": shard_summary.get("shard"),
+            "dataset": shard_summary.get("dataset"),
+            "questions": len(shard_summary["results"]),
+            "repeat": shard_summary.get("repeat", 1),
+            "server": (shard_summary.get("server") or {}).get("final"),
+        })
+
+    # Warn about shards of a split that were not passed
+    split_sizes = {int(s["shard"].split("/")[1]) for s in shards if s["shard"]}
+    if len(split_sizes) == 1:
+        missing = set(range(split_sizes.pop())) - {int(s["shard"].split("/")[0]) for s in shards}
+        if missing:
+            print(f"{Fore.YELLOW}Warning: results of shard(s) {sorted(missing)} are missing{Style.RESET_ALL}")
+
+    cache_summary = None
+    if use_cache:
+        lookups = cache_counts["hits"] + cache_counts["misses"]
+        cache_summary = {**cache_counts, "hit_rate": round(cache_counts["hits"] / lookups, 4) if lookups else 0}
+
+    results = [results_by_idx[idx] for idx in sorted(results_by_idx)]
+    summary = summarize_results(results, cache_summary=cache_summary)
+    summary["shards"] = shards
+
+    print_summary(summary)
+    _save_results(summary, output_file)
+
     return summary
 
 
+def _latency_samples(result: dict) -> list[float]:
+    """Response times of all runs of a question (one run without --repeat)."""
+    if result.get("runs"):
+        return [run["response_time"] for run in result["runs"]]
+    return [result["response_time"]]
+
+
+def compare_results(baseline_file: str, candidate_file: str, output_file: str | None = None) -> dict:
+    """
+    Compare the latency and accuracy of two results files, question by question.
+
+    Per question, the difference in median response time gets a bootstrap confidence interval
+    when both files have repeated runs (--repeat). Overall, the mean of the paired per-question
+    differences gets a bootstrap confidence interval over questions, and the accuracy change is
+    tested with an exact McNemar test. Changes whose interval excludes zero (or p < 0.05) are
+    significant. Only the two aggregate tests decide regressions: a significant mean slowdown
+    or accuracy drop. Per-question intervals are uncorrected for multiple comparisons (with
+    20 questions, one unchanged question is expected to look significant by chance), so
+    significant per-question slowdowns are only listed under `slower_questions`.
+
+    Args:
+        baseline_file: Results file before the change
+        candidate_file: Results file after the change
+        output_file: Optional path to write the comparison to
+
+    Returns:
+        Dict with per-question and aggregate deltas, the list of regressions and the
+        (informational) list of significantly slower questions
+    """
+    with open(baseline_file, "r") as f:
+        baseline = {r["question_idx"]: r for r in json.load(f)["results"]}
+    with open(candidate_file, "r") as f:
+        candidate = {r["question_idx"]: r for r in json.load(f)["results"]}
+
+    # Only questions present (with the same text) in both files are compared
+    common = [
+        idx for idx in sorted(baseline.keys() & candidate.keys())
+        if baseline[idx]["question"] == candidate[idx]["question"]
+    ]
+
+    questions = []
+    for idx in common:
+        if baseline[idx].get("cached") or candidate[idx].get("cached"):
+            # A cached answer says nothing about latency; still compare correctness
+            questions.append({
+                "question_idx": idx, "baseline_median": None, "candidate_median": None, "delta": None, "ci": None,
+                "significant": False, "cached": True,
+                "baseline_correct": baseline[idx]["correct"], "candidate_correct": candidate[idx]["correct"],
+            })
+            continue
+        baseline_times, candidate_times = _latency_samples(baseline[idx]), _latency_samples(candidate[idx])
+        delta = stats.median(candidate_times) - stats.median(baseline_times)
+        low, high = stats.bootstrap_diff_ci(baseline_times, candidate_times)
+        repeated = len(baseline_times) > 1 and len(candidate_times) > 1
+        questions.append({
+            "question_idx": idx,
+            "baseline_median": round(stats.median(baseline_times), 2),
+            "candidate_median": round(stats.median(candidate_times), 2),
+            "delta": round(delta, 2),
+            "ci": [round(low, 2), round(high, 2)] if repeated else None,
+            "significant": repeated and (low > 0 or high < 0),
+            "baseline_correct": baseline[idx]["correct"],
+            "candidate_correct": candidate[idx]["correct"],
+        })
+
+    timed = [q for q in questions if q["delta"] is not None]
+    deltas = [q["delta"] for q in timed]
+    low, high = stats.bootstrap_ci(deltas)
+    baseline_mean = stats.mean([q["baseline_median"] for q in timed])
+    latency = {
+        "questions": len(timed),
+        "baseline_mean": round(baseline_mean, 2),
+        "candidate_mean": round(stats.mean([q["candidate_median"] for q in timed]), 2),
+        "mean_delta": round(stats.mean(deltas), 2),
+        "relative_delta": round(stats.mean(deltas) / baseline_mean, 4) if baseline_mean else 0,
+        "ci": [round(low, 2), round(high, 2)],
+        "significant": len(deltas) > 1 and (low > 0 or high < 0),
+    }
+
+    only_baseline = sum(1 for q in questions if q["baseline_correct"] and not q["candidate_correct"])
+    only_candidate = sum(1 for q in questions if q["candidate_correct"] and not q["baseline_correct"])
+    p_value = stats.mcnemar_p(only_baseline, only_candidate)
+    accuracy = {
+        "baseline": round(sum(q["baseline_correct"] for q in questions) / len(questions) * 100, 2) if questions else 0,
+        "candidate": round(sum(q["candidate_correct"] for q in questions) / len(questions) * 100, 2) if questions else 0,
+        "fixed": only_candidate,
+        "broken": only_baseline,
+        "p_value": round(p_value, 4),
+        "significant": p_value < 0.05,
+    }
+
+    regressions = []
+    if latency["significant"] and latency["mean_delta"] > 0:
+        regressions.append(f"latency: +{latency['mean_delta']:.2f}s per question (95% CI {latency['ci']})")
+    if accuracy["significant"] and only_baseline > only_candidate:
+        regressions.append(f"accuracy: {accuracy['baseline']:.2f}% → {accuracy['candidate']:.2f}% (p={p_value:.4f})")
+    slower_questions = [
+        f"question {q['question_idx']}: +{q['delta']:.2f}s (95% CI {q['ci']})"
+        for q in questions if q["significant"] and q["delta"] > 0
+    ]
+
+    comparison = {
+        "baseline": baseline_file,
+        "candidate": candidate_file,
+        "questions_compared": len(questions),
+        "latency": latency,
+        "accuracy": accuracy,
+        "regressions": regressions,
+        "slower_questions": slower_questions,
+        "per_question": questions,
+    }
+
+    # Print comparison
+    print(f"\n{Fore.CYAN}{Style.BRIGHT}{'=' * 80}")
+    print(f"COMPARISON: {baseline_file} → {candidate_file}")
+    print(f"{'=' * 80}{Style.RESET_ALL}")
+    for q in questions:
+        color = Fore.RED if q["significant"] and q["delta"] > 0 else Fore.GREEN if q["significant"] else Fore.WHITE
+        verdict = {(True, False): " ✗ broken", (False, True): " ✓ fixed"}.get(
+            (q["baseline_correct"], q["candidate_correct"]), "")
+        if q["delta"] is None:
+            print(f"{Fore.WHITE}Question {q['question_idx']}:{Style.RESET_ALL} cached, latency not compared{verdict}")
+            continue
+        ci = f" [{q['ci'][0]:+.2f}, {q['ci'][1]:+.2f}]" if q["ci"] else ""
+        print(f"{color}Question {q['question_idx']}:{Style.RESET_ALL} {q['baseline_median']:.2f}s → "
+              f"{q['candidate_median']:.2f}s ({q['delta']:+.2f}s{ci}){verdict}")
+    print(f"\n{Fore.MAGENTA}Mean Latency:{Style.RESET_ALL} {latency['baseline_mean']:.2f}s → {latency['candidate_mean']:.2f}s"
+          f" ({latency['mean_delta']:+.2f}s, {latency['relative_delta'] * 100:+.1f}%,"
+          f" 95% CI [{latency['ci'][0]:+.2f}, {latency['ci'][1]:+.2f}])"
+          + (" significant" if latency["significant"] else ""))
+    print(f"{Fore.MAGENTA}Accuracy:{Style.RESET_ALL} {accuracy['baseline']:.2f}% → {accuracy['candidate']:.2f}%"
+          f" ({accuracy['fixed']} fixed, {accuracy['broken']} broken, McNemar p={accuracy['p_value']:.4f})")
+    if slower_questions:
+        print(f"\n{Fore.YELLOW}Slower questions (per-question 95% CI, uncorrected, not counted as regressions):"
+              f"{Style.RESET_ALL}")
+        for question in slower_questions:
+            print(f"{Fore.YELLOW}  {question}{Style.RESET_ALL}")
+    if regressions:
+        print(f"\n{Fore.RED}{Style.BRIGHT}Regressions:{Style.RESET_ALL}")
+        for regression in regressions:
+            print(f"{Fore.RED}  {regression}{Style.RESET_ALL}")
+    else:
+        print(f"\n{Fore.GREEN}{Style.BRIGHT}No significant regressions{Style.RESET_ALL}")
+    print(f"{Fore.CYAN}{'=' * 80}{Style.RESET_ALL}")
+
+    if output_file is not None:
+        _save_results(comparison, output_file)
+
+    return comparison
+
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Evaluate the agent on train dataset")
     parser.add_argument(
@@ -300,31 +953,108 @@ if __name__ == "__main__":
         type=int,
         help="Question index to evaluate (0-based). If not provided, evaluates all questions.",
     )
+    parser.add_argument(
+        "--dataset",
+        type=str,
+        default=DATASET_PATH,
+        help=f"Dataset file, JSON or JSONL (one question per line). Default: {DATASET_PATH}",
+    )
+    parser.add_argument(
+        "--shard",
+        type=str,
+        help="Evaluate only shard i of n (0-based), e.g. 0/4. Combine the shards' results with --merge.",
+    )
+    parser.add_argument(
+        "--merge",
+        nargs="+",
+        metavar="RESULTS_FILE",
+        help="Merge the results files of several shards into one summary instead of evaluating.",
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=1,
+        help="Run each question this many times to measure its latency distribution (bypasses the answer cache).",
+    )
+    parser.add_argument(
+        "--check-normalizer",
+        action="store_true",
+        help="Check the answer normalizer against known matching and non-matching answer pairs.",
+    )
+    parser.add_argument(
+        "--compare",
+        nargs=2,
+        metavar=("BASELINE", "CANDIDATE"),
+        help="Compare two results files: latency and accuracy deltas with confidence intervals, flagging regressions.",
+    )
     parser.add_argument(
         "--output",
         type=str,
         help="Output file path for results. Default: evaluation_results_<timestamp>.json",
     )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Bypass the answer cache and always run the agent.",
+    )
+    parser.add_argument(
+        "--trace-dir",
+        type=str,
+        help="Write a Chrome trace per question to this directory (open in ui.perfetto.dev).",
+    )
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        help="Time budget per question in seconds (default: 120). The agent answers with what it has by then.",
+    )
+    parser.add_argument(
+        "--prefetch",
+        action="store_true",
+        help="Extract attachments concurrently before the agent starts and give it their contents.",
+    )
 
     args = parser.parse_args()
-
-    if args.question is not None:
+    if args.trace_dir:
+        # Read by the runner; the server started by the runner inherits it too
+        os.environ["TRACE_DIR"] = args.trace_dir
+    if args.prefetch:
+        os.environ["PREFETCH_ATTACHMENTS"] = "1"
+    if args.timeout:
+        os.environ["QUESTION_TIMEOUT"] = str(args.timeout)
+
+    if args.check_normalizer:
+        failures = check_normalizer()
+        for response, expected_answer, should_match in failures:
+            print(f"{Fore.RED}{response!r} vs {expected_answer!r}: expected"
+                  f" {'a match' if should_match else 'no match'}{Style.RESET_ALL}")
+        print(f"{len(NORMALIZER_CASES) - len(failures)}/{len(NORMALIZER_CASES)} normalizer cases pass")
+        sys.exit(1 if failures else 0)
+    elif args.compare:
+        # Compare two results files; a non-zero exit status signals regressions (e.g. for CI)
+        comparison = compare_results(*args.compare, output_file=args.output)
+        sys.exit(1 if comparison["regressions"] else 0)
+    elif args.merge:
+        # Merge shard results
+        merge_results(args.merge, output_file=args.output)
+    elif args.question is not None:
         # Evaluate single question
         print_banner()
 
-        dataset = _load_dataset()
-        if args.question < 0 or args.question >= len(dataset):
-            raise ValueError(
-                f"Question index {args.question} out of range (0-{len(dataset) - 1})"
-            )
-
-        result = evaluate_single_question(dataset[args.question], args.question)
+        question_data = _load_question(args.dataset, args.question)
+        if args.repeat > 1:
+            result = evaluate_question_repeatedly(question_data, args.question, args.repeat)
+        else:
+            result = evaluate_single_question(question_data, args.question, use_cache=not args.no_cache)
         if result["correct"]:
             print(f"\n{Fore.GREEN}{Style.BRIGHT}Result: ✓ Correct{Style.RESET_ALL}")
         else:
             print(f"\n{Fore.RED}{Style.BRIGHT}Result: ✗ Incorrect{Style.RESET_ALL}")
 
         print(f"{Fore.MAGENTA}Response Time:{Style.RESET_ALL} {result['response_time']:.2f}s")
+        if "latency" in result:
+            print(f"{Fore.MAGENTA}Response Time over {args.repeat} Runs:{Style.RESET_ALL} p50 {result['latency']['p50']:.2f}s,"
+                  f" p90 {result['latency']['p90']:.2f}s, max {result['latency']['max']:.2f}s")
     else:
-        # Evaluate all questions
-        evaluate_all(output_file=args.output)
+        # Evaluate all questions (or one shard)
+        shard = dataset.parse_shard(args.shard) if args.shard else None
+        evaluate_all(args.dataset, output_file=args.output, use_cache=not args.no_cache, shard=shard, repeat=args.repeat)
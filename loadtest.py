@@ -0,0 +1,272 @@
+"""
+Open-loop load test of the ADK API server.
+
+`evaluate.py` sends one question at a time and waits for the answer (closed loop), which
+says nothing about how the server behaves when questions keep arriving. This script
+replays dataset questions at a fixed arrival rate, constant or Poisson, regardless of how
+fast they are answered, each in its own session, and reports throughput, error rate and
+tail latency per time window. Run it against the stub agent (`stub_agent/`, the default),
+which replays recorded answers and latencies, to stress-test the server and the runner
+without live models.
+"""
+
+import argparse
+import concurrent.futures
+import datetime
+import itertools
+import json
+import random
+import threading
+import time
+
+from colorama import Fore, Style, init
+
+from utils import dataset, server, stats
+
+init(autoreset=True)
+
+DATASET_PATH = "benchmark/train.json"
+ATTACHMENTS_FOLDER_PATH = "benchmark/attachments"
+
+
+def arrival_times(rate: float, duration: float, process: str = "poisson", seed: int = 0) -> list[float]:
+    """
+    Offsets (seconds from the start) at which requests arrive.
+
+    Args:
+        rate: Average arrivals per second
+        duration: Length of the test in seconds
+        process: "constant" (evenly spaced) or "poisson" (exponential inter-arrival times)
+        seed: Random seed of the Poisson process
+    """
+    if process == "constant":
+        return [i / rate for i in range(int(duration * rate))]
+    if process != "poisson":
+        raise ValueError(f"Unknown arrival process '{process}', expected constant or poisson")
+    rng = random.Random(seed)
+    times = []
+    offset = rng.expovariate(rate)
+    while offset < duration:
+        times.append(offset)
+        offset += rng.expovariate(rate)
+    return times
+
+
+def _send(runner: server.ADKAgentRunner, question: str, file_paths: list[str] | None,
+          scheduled: float, in_flight: list[int], lock: threading.Lock) -> dict:
+    """Run one question and time it from its scheduled arrival."""
+    with lock:
+        in_flight[0] += 1
+        concurrency = in_flight[0]
+    start = time.time()
+    request = {"scheduled": scheduled, "start": start, "concurrency": concurrency, "error": None, "timed_out": False}
+    try:
+        agent_run = runner.run(question, file_paths, use_cache=False)
+        request["timed_out"] = agent_run.timed_out
+    except Exception as e:
+        request["error"] = f"{type(e).__name__}: {e}"
+    finally:
+        with lock:
+            in_flight[0] -= 1
+    request["end"] = time.time()
+    # Measured from the scheduled arrival, so time spent queued behind a saturated client counts too
+    request["latency"] = request["end"] - scheduled
+    return request
+
+
+def summarize_requests(requests: list[dict], start: float, window: float) -> dict:
+    """
+    Aggregate the timed requests, overall and per time window of `window` seconds
+    (requests count towards the window they completed in).
+
+    Returns:
+        Dict with overall throughput, error rate and latency distribution, and the same per window
+    """
+    def aggregate(group: list[dict], seconds: float) -> dict:
+        succeeded = [r for r in group if r["error"] is None]
+        return {
+            "completed": len(group),
+            "throughput": round(len(group) / seconds, 3) if seconds > 0 else 0,
+            "errors": len(group) - len(succeeded),
+            "error_rate": round((len(group) - len(succeeded)) / len(group), 4) if group else 0,
+            "timed_out": sum(1 for r in group if r["timed_out"]),
+            "latency": stats.distribution([r["latency"] for r in succeeded]),
+        }
+
+    end = max((r["end"] for r in requests), default=start)
+    windows = []
+    for index in range(int((end - start) // window) + 1):
+        window_start = start + index * window
+        group = [r for r in requests if window_start <= r["end"] < window_start + window]
+        arrived = sum(1 for r in requests if window_start <= r["scheduled"] < window_start + window)
+        windows.append({
+            "start": round(index * window, 3),
+            "offered": arrived,
+            **aggregate(group, min(window, end - window_start)),
+        })
+
+    return {
+        **aggregate(requests, end - start),
+        "duration": round(end - start, 3),
+        "max_concurrency": max((r["concurrency"] for r in requests), default=0),
+        "windows": windows,
+    }
+
+
+def print_report(summary: dict, config: dict):
+    """Print the per-window table and the overall results."""
+    print(f"\n{Fore.CYAN}{Style.BRIGHT}{'=' * 80}")
+    print("LOAD TEST SUMMARY")
+    print(f"{'=' * 80}{Style.RESET_ALL}")
+    print(f"{Fore.WHITE}Agent:{Style.RESET_ALL} {config['agent']} at {config['base_url']},"
+          f" {config['arrival']} arrivals at {config['rate']}/s for {config['duration']}s")
+    print(f"\n{Fore.WHITE}{Style.BRIGHT}{'window':>8} {'offered':>8} {'done':>6} {'req/s':>7} {'errors':>7}"
+          f" {'p50':>8} {'p90':>8} {'p99':>8}{Style.RESET_ALL}")
+    for w in summary["windows"]:
+        color = Fore.RED if w["errors"] or w["timed_out"] else ""
+        print(f"{color}{w['start']:>7.0f}s {w['offered']:>8} {w['completed']:>6} {w['throughput']:>7.2f}"
+              f" {w['errors']:>7} {w['latency']['p50']:>7.2f}s {w['latency']['p90']:>7.2f}s"
+              f" {w['latency']['p99']:>7.2f}s{Style.RESET_ALL}")
+    latency = summary["latency"]
+    print(f"\n{Fore.MAGENTA}Throughput:{Style.RESET_ALL} {summary['throughput']:.2f} req/s"
+          f" ({summary['completed']} requests in {summary['duration']:.1f}s)")
+    print(f"{Fore.MAGENTA}Error Rate:{Style.RESET_ALL} {summary['error_rate'] * 100:.2f}%"
+          f" ({summary['errors']} errors, {summary['timed_out']} timed out)")
+    print(f"{Fore.MAGENTA}Latency:{Style.RESET_ALL} p50 {latency['p50']:.2f}s, p90 {latency['p90']:.2f}s,"
+          f" p99 {latency['p99']:.2f}s, max {latency['max']:.2f}s")
+    print(f"{Fore.MAGENTA}Max Concurrent Requests:{Style.RESET_ALL} {summary['max_concurrency']}")
+    print(f"{Fore.CYAN}{'=' * 80}{Style.RESET_ALL}")
+
+
+def run_load_test(
+    rate: float,
+    duration: float,
+    arrival: str = "poisson",
+    agent: str = "stub_agent",
+    base_url: str = "http://localhost:8000",
+    dataset_path: str = DATASET_PATH,
+    max_concurrency: int = 256,
+    window: float = 10,
+    timeout: float = 120,
+    seed: int = 0,
+    output_file: str | None = None,
+) -> dict:
+    """
+    Send dataset questions (cycling through the dataset) to the server at the given arrival rate.
+
+    Args:
+        rate: Average arrivals per second
+        duration: Seconds during which requests arrive
+        arrival: "constant" or "poisson"
+        agent: ADK app to load (the stub agent replays recorded answers without models)
+        base_url: URL of the ADK API server (started if not running)
+        dataset_path: Dataset file, JSON or JSONL
+        max_concurrency: Maximum number of requests in flight; later arrivals wait, and
+            the wait counts towards their latency
+        window: Seconds per reporting window
+        timeout: Time budget per question in seconds
+        seed: Random seed of the Poisson process
+        output_file: Path of the results file (default: loadtest_results_<timestamp>.json)
+
+    Returns:
+        Dict with the configuration, the summary and every request's timings
+    """
+    questions = []
+    for _, item in dataset.iter_dataset(dataset_path):
+        question, _, file_paths = dataset.unpack_question(item, ATTACHMENTS_FOLDER_PATH)
+        questions.append((question, file_paths))
+    if not questions:
+        raise ValueError(f"No questions in {dataset_path}")
+
+    runner = server.ADKAgentRunner(base_url=base_url, agent_name=agent, user_id="loadtest", question_timeout=timeout)
+    runner.start_server()
+
+    offsets = arrival_times(rate, duration, arrival, seed)
+    print(f"{Fore.CYAN}{Style.BRIGHT}Sending {len(offsets)} requests to {agent} over {duration}s"
+          f" ({arrival}, {rate}/s)...{Style.RESET_ALL}")
+
+    lock = threading.Lock()
+    in_flight = [0]
+    futures = []
+    start = time.time()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_concurrency) as pool:
+        # Open loop: requests are sent on schedule, whether or not earlier ones were answered
+        for offset, (question, file_paths) in zip(offsets, itertools.cycle(questions)):
+            delay = start + offset - time.time()
+            if delay > 0:
+                time.sleep(delay)
+            futures.append(pool.submit(_send, runner, question, file_paths, start + offset, in_flight, lock))
+        requests = [future.result() for future in futures]
+
+    summary = summarize_requests(requests, start, window)
+    config = {
+        "agent": agent, "base_url": base_url, "dataset": dataset_path, "arrival": arrival, "rate": rate,
+        "duration": duration, "max_concurrency": max_concurrency, "window": window, "timeout": timeout, "seed": seed,
+    }
+    print_report(summary, config)
+
+    results = {
+        "timestamp": datetime.datetime.now().isoformat(),
+        "config": config,
+        "summary": summary,
+        "requests": [
+            {**r, "scheduled": round(r["scheduled"] - start, 3), "start": round(r["start"] - start, 3),
+             "end": round(r["end"] - start, 3), "latency": round(r["latency"], 3)}
+            for r in requests
+        ],
+    }
+    if output_file is None:
+        output_file = f"loadtest_results_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    with open(output_file, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\n{Fore.CYAN}Results saved to:{Style.RESET_ALL} {output_file}")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Open-loop load test of the ADK API server")
+    parser.add_argument("--rate", type=float, default=1.0, help="Average arrivals per second. Default: 1")
+    parser.add_argument("--duration", type=float, default=60, help="Seconds during which requests arrive. Default: 60")
+    parser.add_argument(
+        "--arrival",
+        choices=["constant", "poisson"],
+        default="poisson",
+        help="Arrival process: evenly spaced, or Poisson (exponential inter-arrival times). Default: poisson",
+    )
+    parser.add_argument(
+        "--agent",
+        type=str,
+        default="stub_agent",
+        help="ADK app to load. Default: stub_agent (replays recorded answers and latencies, no models)",
+    )
+    parser.add_argument("--base-url", type=str, default="http://localhost:8000", help="ADK API server URL")
+    parser.add_argument("--dataset", type=str, default=DATASET_PATH, help=f"Questions to replay. Default: {DATASET_PATH}")
+    parser.add_argument(
+        "--max-concurrency",
+        type=int,
+        default=256,
+        help="Maximum requests in flight; later arrivals queue and the wait counts as latency. Default: 256",
+    )
+    parser.add_argument("--window", type=float, default=10, help="Seconds per reporting window. Default: 10")
+    parser.add_argument("--timeout", type=float, default=120, help="Time budget per question in seconds. Default: 120")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed of the Poisson process")
+    parser.add_argument(
+        "--output",
+        type=str,
+        help="Output file path for results. Default: loadtest_results_<timestamp>.json",
+    )
+
+    args = parser.parse_args()
+    run_load_test(
+        args.rate,
+        args.duration,
+        arrival=args.arrival,
+        agent=args.agent,
+        base_url=args.base_url,
+        dataset_path=args.dataset,
+        max_concurrency=args.max_concurrency,
+        window=args.window,
+        timeout=args.timeout,
+        seed=args.seed,
+        output_file=args.output,
+    )
@@ -0,0 +1,327 @@
+"""
+Offline micro-benchmarks of the tools' local, CPU-bound hot paths.
+
+Every benchmark runs on synthetic, scaled-up inputs (a large generated PDF, long
+concatenated text, a 100-result SerpAPI payload, a file served by a local HTTP server),
+so no network or API key is needed. Throughput is taken from the fastest of several
+timed runs; peak memory is measured with tracemalloc in a separate run, so tracing does
+not skew the timings.
+
+Record a baseline on the machine that runs the checks, then compare later runs against it:
+
+    python microbench.py --record     # write the baseline
+    python microbench.py              # exit status 1 if a benchmark regressed past the threshold
+"""
+
+import argparse
+import contextlib
+import functools
+import http.server
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from typing import Callable
+
+import fitz
+from colorama import Fore, Style, init
+
+from my_agent.tools.file_download import download_file
+from my_agent.tools.pdf_extract import pdf_extract
+from my_agent.tools.segmentation import Segmenter
+from my_agent.tools.text_processor import text_processor
+from my_agent.tools.web_search import build_context, extract_snippets
+from utils import stats
+
+init(autoreset=True)
+
+BASELINE_PATH = "benchmark/microbench_baseline.json"
+ATTACHMENTS_FOLDER_PATH = "benchmark/attachments"
+
+# Relative throughput drop or peak memory growth that counts as a regression
+DEFAULT_THRESHOLD = 0.2
+
+# Peak memory changes below this many bytes are noise, whatever the ratio
+MEMORY_NOISE_BYTES = 256 * 1024
+
+SENTENCE = "theseagullglidedpeacefullytomychairwhilethesunsetoverthequietharbour"
+PARAGRAPH = (
+    "The harbour master recorded 1,204 arrivals in 1887, most of them fishing vessels from the northern coast. "
+    "Cargo manifests list timber, salt, wool and copper ore, with prices quoted in shillings per ton. "
+)
+
+# name -> setup(workdir, scale) returning (function to time, units processed per call, unit name)
+BENCHMARKS: dict[str, Callable[[str, int], tuple[Callable[[], object], int, str]]] = {}
+
+
+def benchmark(name: str):
+    """Register a benchmark setup function under `name`."""
+    def register(setup):
+        BENCHMARKS[name] = setup
+        return setup
+    return register
+
+
+def _write_pdf(path: str, pages: int):
+    doc = fitz.open()
+    for page_number in range(pages):
+        page = doc.new_page()
+        page.insert_textbox(fitz.Rect(50, 50, 550, 800), f"Page {page_number + 1}\n" + PARAGRAPH * 12, fontsize=9)
+    doc.save(path)
+    doc.close()
+
+
+@benchmark("pdf_extract")
+def _pdf_extract(workdir: str, scale: int):
+    path = os.path.join(workdir, "large.pdf")
+    _write_pdf(path, pages=200 * scale)
+    chars = len(pdf_extract(path))
+    return functools.partial(pdf_extract, path), chars, "char"
+
+
+@benchmark("pdf_extract_attachments")
+def _pdf_extract_attachments(workdir: str, scale: int):
+    paths = sorted(
+        os.path.join(ATTACHMENTS_FOLDER_PATH, name) for name in os.listdir(ATTACHMENTS_FOLDER_PATH)
+        if name.lower().endswith(".pdf")
+    ) if os.path.isdir(ATTACHMENTS_FOLDER_PATH) else []
+    if not paths:
+        return None
+    chars = sum(len(pdf_extract(path)) for path in paths)
+    return lambda: [pdf_extract(path) for path in paths], chars, "char"
+
+
+@benchmark("segmentation")
+def _segmentation(workdir: str, scale: int):
+    text = SENTENCE * 300 * scale
+    # A fresh segmenter without memo every run, so repeated windows of the periodic input do not flatter it
+    return lambda: sum(1 for _ in Segmenter(cache_size=0).iter_words([text])), len(text), "char"
+
+
+@benchmark("text_processor")
+def _text_processor(workdir: str, scale: int):
+    # Fixed-width chunks, as read from a grid puzzle, processed as one text. Unlike the benchmark
+    # above this goes through the shared segmenter, so it measures the memoized steady state
+    text = (SENTENCE * 200 * scale).upper()
+    chunks = [text[i:i + 5] for i in range(0, len(text), 5)]
+    return functools.partial(text_processor, chunks), len(text), "char"
+
+
+def _search_payload(results: int) -> dict:
+    """SerpAPI-shaped response with an answer box, a knowledge graph and `results` organic results."""
+    return {
+        "answer_box": {"title": "Featured Snippet", "snippet": PARAGRAPH * 3, "link": "https://example.org/answer"},
+        "knowledge_graph": {"title": "Harbour", "description": PARAGRAPH * 2},
+        "organic_results": [
+            {
+                "position": i + 1,
+                "title": f"Result {i + 1}: harbour records",
+                "link": f"https://example.org/{i}",
+                "snippet": PARAGRAPH * (1 + i % 4),
+                "displayed_link": f"example.org › {i}",
+                "sitelinks": {"inline": [{"title": f"Link {j}", "link": f"https://example.org/{i}/{j}"} for j in range(4)]},
+            }
+            for i in range(results)
+        ],
+    }
+
+
+@benchmark("extract_snippets")
+def _extract_snippets(workdir: str, scale: int):
+    # SerpAPI responses arrive as JSON text, so parsing is part of the hot path
+    payload = json.dumps(_search_payload(100 * scale))
+    return lambda: extract_snippets(json.loads(payload)), len(payload), "byte"
+
+
+@benchmark("build_context")
+def _build_context(workdir: str, scale: int):
+    snippets = extract_snippets(_search_payload(100 * scale))
+    question = "How many arrivals did the harbour master record in 1887?"
+    calls = 10000
+
+    def run():
+        for _ in range(calls):
+            build_context(question, snippets)
+
+    return run, calls, "call"
+
+
+class _QuietHandler(http.server.SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+@benchmark("download_file")
+def _download_file(workdir: str, scale: int):
+    serve_dir = os.path.join(workdir, "serve")
+    os.makedirs(serve_dir)
+    size = 32 * 1024 * 1024 * scale
+    with open(os.path.join(serve_dir, "payload.bin"), "wb") as f:
+        f.write(os.urandom(1024 * 1024) * (size // (1024 * 1024)))
+
+    handler = functools.partial(_QuietHandler, directory=serve_dir)
+    httpd = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{httpd.server_address[1]}/payload.bin"
+    save_dir = os.path.join(workdir, "downloads")
+
+    def run():
+        success, message = download_file(url, save_dir=save_dir)
+        if not success:
+            raise RuntimeError(message)
+
+    return run, size, "byte"
+
+
+def measure(fn: Callable[[], object], units: int, repeat: int) -> dict:
+    """
+    Time `fn` `repeat` times (after one warm-up call), then measure its peak memory once.
+
+    Returns:
+        Dict with the median and minimum seconds per call, throughput (units per second,
+        from the fastest run, which is the least disturbed by other activity on the machine)
+        and peak traced memory in bytes
+    """
+    fn()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        fn()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    fastest = min(timings)
+    return {
+        "seconds": round(stats.median(timings), 6),
+        "min_seconds": round(fastest, 6),
+        "units": units,
+        "throughput": round(units / fastest, 3) if fastest > 0 else 0,
+        "peak_memory": peak,
+    }
+
+
+def run_benchmarks(names: list[str] | None = None, scale: int = 1, repeat: int = 5) -> dict:
+    """
+    Run the selected benchmarks (default: all) in a temporary directory.
+
+    Returns:
+        Dict mapping benchmark name to its measurement (see `measure`) and unit
+    """
+    results = {}
+    workdir = tempfile.mkdtemp(prefix="microbench_")
+    try:
+        for name in names or BENCHMARKS:
+            bench_dir = os.path.join(workdir, name)
+            os.makedirs(bench_dir)
+            # The tools print their errors; keep the report readable
+            with contextlib.redirect_stdout(sys.stderr):
+                setup = BENCHMARKS[name](bench_dir, scale)
+            if setup is None:
+                print(f"{Fore.YELLOW}{name}: skipped (no input){Style.RESET_ALL}")
+                continue
+            fn, units, unit = setup
+            results[name] = {**measure(fn, units, repeat), "unit": unit}
+            r = results[name]
+            print(f"{name:<26} {_format_throughput(r['throughput'], unit):>16}"
+                  f"  {r['min_seconds'] * 1000:10.2f} ms  peak {r['peak_memory'] / 1e6:8.2f} MB")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+def _format_throughput(throughput: float, unit: str) -> str:
+    if unit in ("byte", "char") and throughput >= 1e6:
+        return f"{throughput / 1e6:.2f} M{unit}/s"
+    if unit in ("byte", "char"):
+        return f"{throughput / 1e3:.1f} k{unit}/s"
+    return f"{throughput:.1f} {unit}/s"
+
+
+def compare_to_baseline(results: dict, baseline: dict, threshold: float) -> list[str]:
+    """
+    Compare results with a baseline run at the same scale.
+
+    Returns:
+        Descriptions of the regressions: throughput more than `threshold` below the baseline,
+        or peak memory more than `threshold` above it
+    """
+    regressions = []
+    for name, r in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        if r["throughput"] < base["throughput"] * (1 - threshold):
+            regressions.append(
+                f"{name}: throughput {_format_throughput(r['throughput'], r['unit'])}"
+                f" vs {_format_throughput(base['throughput'], r['unit'])} baseline"
+                f" ({(r['throughput'] / base['throughput'] - 1) * 100:+.1f}%)"
+            )
+        if (r["peak_memory"] > base["peak_memory"] * (1 + threshold)
+                and r["peak_memory"] - base["peak_memory"] > MEMORY_NOISE_BYTES):
+            regressions.append(
+                f"{name}: peak memory {r['peak_memory'] / 1e6:.2f} MB vs {base['peak_memory'] / 1e6:.2f} MB baseline"
+                f" ({(r['peak_memory'] / base['peak_memory'] - 1) * 100:+.1f}%)"
+            )
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline micro-benchmarks of the tools' hot paths")
+    parser.add_argument("--only", nargs="+", choices=sorted(BENCHMARKS), help="Run only these benchmarks")
+    parser.add_argument("--scale", type=int, default=1, help="Multiply the input sizes. Default: 1")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per benchmark. Default: 5")
+    parser.add_argument("--baseline", type=str, default=BASELINE_PATH, help=f"Baseline file. Default: {BASELINE_PATH}")
+    parser.add_argument("--record", action="store_true", help="Save the results as the new baseline instead of comparing")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=DEFAULT_THRESHOLD,
+        help=f"Relative throughput drop or memory growth counted as a regression. Default: {DEFAULT_THRESHOLD}",
+    )
+    parser.add_argument("--output", type=str, help="Also write the results to this file")
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.only, scale=args.scale, repeat=args.repeat)
+    report = {"scale": args.scale, "repeat": args.repeat, "results": results}
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.record:
+        # Keep the baselines of benchmarks that were not run this time
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                previous = json.load(f)
+            if previous.get("scale") == args.scale:
+                report["results"] = {**previous["results"], **results}
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n{Fore.CYAN}Baseline saved to:{Style.RESET_ALL} {args.baseline}")
+        sys.exit(0)
+
+    if not os.path.exists(args.baseline):
+        print(f"\n{Fore.YELLOW}No baseline at {args.baseline}; record one with --record.{Style.RESET_ALL}")
+        sys.exit(0)
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    if baseline.get("scale") != args.scale:
+        print(f"{Fore.RED}Baseline was recorded at scale {baseline.get('scale')}, not {args.scale}{Style.RESET_ALL}")
+        sys.exit(2)
+
+    regressions = compare_to_baseline(results, baseline["results"], args.threshold)
+    if regressions:
+        print(f"\n{Fore.RED}{Style.BRIGHT}Regressions (threshold {args.threshold * 100:.0f}%):{Style.RESET_ALL}")
+        for regression in regressions:
+            print(f"{Fore.RED}  {regression}{Style.RESET_ALL}")
+        sys.exit(1)
+    print(f"\n{Fore.GREEN}{Style.BRIGHT}No regressions against {args.baseline}{Style.RESET_ALL}")
@@ -1 +1 @@
-from .agent import root_agent
+from .agent import root_agent, app
@@ -3,8 +3,17 @@ This file is where you will implement your agent.
 The `root_agent` is used to evaluate your agent's performance.
 """
 
+import os
+
 from google.adk.agents import llm_agent
-from my_agent.tools import web_search, pdf_extract, text_processor, read_png, download_file, remove_file
+from google.adk.apps import App
+from my_agent.cascade import CASCADE_ENABLED, FAST_MODEL, STRONG_MODEL, CascadeAgent, load_verifier
+from my_agent.plugins import (
+    AttachmentPrefetchPlugin, DeadlinePlugin, OutputPolicyPlugin, RateLimitPlugin, TracingPlugin, UsagePlugin,
+)
+from my_agent.router import RouterAgent, build_router
+from my_agent.tools import web_search, pdf_extract, text_processor, read_png, download_file, remove_file, read_more
+from utils import deadline
 
 # Root agent instruction - routes to appropriate sub-agents
 ROOT_INSTRUCTION = """
@@ -57,40 +66,104 @@ APPROACH:
 
 Be precise with calculations and formatting."""
 
+# Blocking tools run in worker threads, bounded by the question's deadline
+TOOLS = [
+    *(deadline.bounded(tool) for tool in (web_search, pdf_extract, text_processor, read_png, download_file)),
+    remove_file,
+    read_more,
+]
+
+# Contents of the attachments extracted before the agent started (empty without prefetch)
+ATTACHMENT_CONTEXT = "{attachment_context?}"
+
+
+def _specialist(name: str, model: str, description: str, instruction: str):
+    """
+    Create a sub-agent on the given model, or, in cascade mode, a cascade that tries the
+    fast model first and escalates to `model` when the verifier rejects the answer.
+    """
+    instruction += ATTACHMENT_CONTEXT
+    if not CASCADE_ENABLED or model == FAST_MODEL:
+        return llm_agent.Agent(
+            model=model,
+            name=name,
+            description=description,
+            instruction=instruction,
+            tools=TOOLS,
+            sub_agents=[],
+        )
+
+    tiers = [
+        llm_agent.Agent(
+            model=tier_model,
+            name=f"{name}_{tier_name}",
+            description=description,
+            instruction=instruction,
+            tools=TOOLS,
+            sub_agents=[],
+            # Tiers answer on behalf of the cascade, they must not hand the question off
+            disallow_transfer_to_parent=True,
+            disallow_transfer_to_peers=True,
+        )
+        for tier_name, tier_model in (("fast", FAST_MODEL), ("strong", model))
+    ]
+    return CascadeAgent(name=name, description=description, verifier=load_verifier(), sub_agents=tiers)
+
+
 # Create sub-agents
-reasoning_agent = llm_agent.Agent(
-    model='gemini-2.5-pro',
+reasoning_agent = _specialist(
+    model=STRONG_MODEL,
     name='reasoning_agent',
     description="Specialized agent for logical puzzles, instruction following, grammar/translation, and chess problems.",
     instruction=REASONING_INSTRUCTION,
-    tools=[web_search, pdf_extract, text_processor, read_png, download_file, remove_file],
-    sub_agents=[],
 )
 
-text_processing_agent = llm_agent.Agent(
+text_processing_agent = _specialist(
     model='gemini-2.5-flash',
     name='text_processing_agent',
     description="Specialized agent for external knowledge, facts, trivia, and word problems. Uses web search and text processing.",
     instruction=TEXT_PROCESSING_INSTRUCTION,
-    tools=[web_search, pdf_extract, text_processor, read_png, download_file, remove_file],
-    sub_agents=[],
 )
 
-math_agent = llm_agent.Agent(
-    model='gemini-2.5-pro',
+math_agent = _specialist(
+    model=STRONG_MODEL,
     name='math_agent',
     description="Specialized agent for mathematical calculations and quantitative problems. Can read PDFs for numeric data.",
     instruction=MATH_INSTRUCTION,
-    tools=[web_search, pdf_extract, text_processor, read_png, download_file, remove_file],
-    sub_agents=[],
 )
 
-# Root agent that routes to sub-agents
-root_agent = llm_agent.Agent(
+# LLM router that routes to sub-agents
+llm_router_agent = llm_agent.Agent(
     model='gemini-2.5-flash-lite',
-    name='agent',
+    name='llm_router',
     description="Master coordinator that routes questions to specialized sub-agents for reasoning, text processing, and math.",
     instruction=ROOT_INSTRUCTION,
     tools=[],  # Root agent routes to sub-agents, doesn't use tools directly
     sub_agents=[reasoning_agent, text_processing_agent, math_agent],
 )
+
+# Root agent: routes locally when confident, otherwise defers to the LLM router.
+# Set LOCAL_ROUTER=0 to always use the LLM router.
+if os.getenv("LOCAL_ROUTER", "1") == "1":
+    root_agent = RouterAgent(
+        name='agent',
+        description="Routes questions to specialized sub-agents, using the LLM router only when unsure.",
+        llm_router=llm_router_agent,
+        router=build_router(),
+        sub_agents=[llm_router_agent],
+    )
+else:
+    root_agent = llm_router_agent
+
+# Plugins applied to every agent and tool. Set TOOL_OUTPUT_POLICY=0 to pass tool outputs through unchanged.
+# RateLimitPlugin retries failed model calls before DeadlinePlugin falls back to a best-effort answer
+plugins = [TracingPlugin(), RateLimitPlugin(), DeadlinePlugin(), UsagePlugin(), AttachmentPrefetchPlugin()]
+if os.getenv("TOOL_OUTPUT_POLICY", "1") == "1":
+    plugins.append(OutputPolicyPlugin())
+
+# App wrapping the root agent with the plugins
+app = App(
+    name='my_agent',
+    root_agent=root_agent,
+    plugins=plugins,
+)
@@ -0,0 +1,196 @@
+"""
+Model cascade: answer with a fast model first and escalate to a stronger one
+only when the fast answer does not pass a verifier.
+"""
+
+import importlib
+import os
+import re
+import time
+from typing import AsyncGenerator, Callable, List
+
+from google.adk.agents import BaseAgent
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.events import Event, EventActions
+from google.adk.sessions.state import State
+
+from utils import usage
+
+# Set MODEL_CASCADE=1 to run fast models first
+CASCADE_ENABLED = os.getenv("MODEL_CASCADE", "0") == "1"
+
+FAST_MODEL = 'gemini-2.5-flash'
+STRONG_MODEL = 'gemini-2.5-pro'
+
+# Answers containing these phrases are treated as low-confidence. Tool failures surface as
+# answers starting with "Error:"/"ERROR:"; a bare "error" would also match correct answers
+# such as "standard error"
+LOW_CONFIDENCE_PATTERNS = re.compile(
+    r"\b(i don't know|i do not know|not sure|unable to|i cannot|i can't|could not|couldn't|"
+    r"no search results|not enough information|cannot be determined)\b|^\s*error\b\s*:",
+    re.IGNORECASE,
+)
+
+# The agents are told to output only the final answer, so long or multi-line output is malformed
+MAX_ANSWER_CHARS = 300
+MAX_ANSWER_LINES = 3
+
+Verifier = Callable[[str, str], bool]
+
+
+def default_verifier(question: str, answer: str) -> bool:
+    """
+    Accept an answer unless it is empty, hedged, or does not look like a bare final answer.
+
+    Args:
+        question: The question that was asked
+        answer: The answer produced by the tier
+
+    Returns:
+        True if the answer can be returned without escalating
+    """
+    answer = answer.strip()
+    if not answer:
+        return False
+    if LOW_CONFIDENCE_PATTERNS.search(answer):
+        return False
+    if len(answer) > MAX_ANSWER_CHARS or answer.count("\n") >= MAX_ANSWER_LINES:
+        return False
+    return True
+
+
+def load_verifier() -> Verifier:
+    """
+    Load the verifier named by CASCADE_VERIFIER ("package.module:function"),
+    falling back to `default_verifier`.
+    """
+    spec = os.getenv("CASCADE_VERIFIER")
+    if not spec:
+        return default_verifier
+    module_name, _, function_name = spec.partition(":")
+    return getattr(importlib.import_module(module_name), function_name)
+
+
+def _answer_text(events: List[Event]) -> str:
+    """Concatenate the non-thought text the events would show to the user."""
+    texts = []
+    for event in events:
+        if event.partial or not event.content or not event.content.parts:
+            continue
+        texts.extend(part.text for part in event.content.parts if part.text and not part.thought)
+    return "".join(texts)
+
+
+class CascadeAgent(BaseAgent):
+    """
+    Runs its sub-agents (tiers) in order, from cheapest to strongest.
+
+    Every tier but the last runs against a scratch copy of the session and its events
+    are only published if the verifier accepts its answer; otherwise they are dropped
+    and the next tier starts from the original session. The outcome is recorded in
+    session state under "cascade".
+    """
+
+    verifier: Verifier = default_verifier
+
+    async def _run_async_impl(self, ctx: InvocationContext) -> AsyncGenerator[Event, None]:
+        question = ""
+        if ctx.user_content and ctx.user_content.parts:
+            question = "".join(part.text or "" for part in ctx.user_content.parts)
+
+        attempts = []
+        # Usage of rejected attempts, whose events are dropped, is kept in state
+        rejected_usage = {}
+        for index, tier in enumerate(self.sub_agents):
+            start = time.perf_counter()
+            attempt = {"agent": tier.name, "model": getattr(tier, "model", None)}
+            attempts.append(attempt)
+
+            if index == len(self.sub_agents) - 1:
+                # Last tier: nothing to fall back to, so stream its events directly
+                async for event in tier.run_async(ctx):
+                    yield event
+                attempt["latency"] = round(time.perf_counter() - start, 3)
+                attempt["accepted"] = True
+                break
+
+            scratch_ctx = ctx.model_copy(update={"session": ctx.session.model_copy(deep=True)})
+            events = []
+            async for event in tier.run_async(scratch_ctx):
+                events.append(event)
+                if not event.partial:
+                    # Mirror what the session service does, so the tier sees its own tool results
+                    for key, value in (event.actions.state_delta or {}).items():
+                        if not key.startswith(State.TEMP_PREFIX):
+                            scratch_ctx.session.state[key] = value
+                    scratch_ctx.session.events.append(event)
+
+            attempt["latency"] = round(time.perf_counter() - start, 3)
+            attempt["accepted"] = self.verifier(question, _answer_text(events))
+            if attempt["accepted"]:
+                for event in events:
+                    yield event
+                break
+
+            rejected_usage[f"{usage.STATE_PREFIX}{ctx.invocation_id}:{tier.name}"] = usage.event_records(events, model=attempt["model"])
+            for event in events:
+                rejected_usage.update({
+                    key: value for key, value in (event.actions.state_delta or {}).items()
+                    if key.startswith(usage.STATE_PREFIX)
+                })
+
+        yield Event(
+            invocation_id=ctx.invocation_id,
+            author=self.name,
+            branch=ctx.branch,
+            actions=EventActions(state_delta={"cascade": {
+                "agent": self.name,
+                "tier": len(attempts) - 1,
+                "model": attempts[-1]["model"],
+                "attempts": attempts,
+            }, **rejected_usage}),
+        )
+
+
+if __name__ == "__main__":
+    # Check of the rejection path without models: a fast stub tier that does not know the
+    # answer, a strong stub tier that does, run through the ADK runner
+    import asyncio
+
+    from google.adk.runners import InMemoryRunner
+    from google.genai import types
+
+    class StubTier(BaseAgent):
+        model: str
+        answer: str
+
+        async def _run_async_impl(self, ctx: InvocationContext) -> AsyncGenerator[Event, None]:
+            yield Event(
+                invocation_id=ctx.invocation_id,
+                author=self.name,
+                branch=ctx.branch,
+                content=types.Content(role="model", parts=[types.Part(text=self.answer)]),
+                usage_metadata=types.GenerateContentResponseUsageMetadata(
+                    prompt_token_count=100, candidates_token_count=5, total_token_count=105),
+            )
+
+    async def check():
+        cascade = CascadeAgent(name="cascade", sub_agents=[
+            StubTier(name="fast", model=FAST_MODEL, answer="I don't know"),
+            StubTier(name="strong", model=STRONG_MODEL, answer="Paris"),
+        ])
+        runner = InMemoryRunner(agent=cascade, app_name="cascade_check")
+        session = await runner.session_service.create_session(app_name="cascade_check", user_id="check")
+        message = types.Content(role="user", parts=[types.Part(text="What is the capital of France?")])
+        events = [event async for event in runner.run_async(user_id="check", session_id=session.id, new_message=message)]
+        session = await runner.session_service.get_session(app_name="cascade_check", user_id="check", session_id=session.id)
+        return events, session.state
+
+    events, state = asyncio.run(check())
+    assert _answer_text(events) == "Paris", _answer_text(events)
+    outcome = state["cascade"]
+    assert outcome["model"] == STRONG_MODEL and [a["accepted"] for a in outcome["attempts"]] == [False, True], outcome
+    records = usage.run_records(events, state)
+    assert [(r["agent"], r["model"]) for r in records] == [("strong", None), ("fast", FAST_MODEL)], records
+    print(f"Rejected {outcome['attempts'][0]['agent']}, answered by {outcome['attempts'][1]['agent']};"
+          f" usage of both tiers recorded ({usage.summarize(records)['total']['total_tokens']} tokens)")
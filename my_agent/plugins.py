@@ -0,0 +1,375 @@
+"""
+ADK plugins applied to every agent and tool of the app.
+"""
+
+import asyncio
+import functools
+import time
+from typing import Any, Optional
+
+from google.adk.agents.base_agent import BaseAgent
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.adk.models.registry import LLMRegistry
+from google.adk.plugins.base_plugin import BasePlugin
+from google.adk.tools.base_tool import BaseTool
+from google.adk.tools.tool_context import ToolContext
+from google.genai import types
+
+from my_agent import prefetch
+from my_agent.tools import output_policy
+from utils import deadline, ratelimit, tracing, usage
+
+# Session state keys holding tool output sizes start with this prefix
+COMPACTION_STATE_PREFIX = "compaction:"
+
+
+@functools.lru_cache(maxsize=None)
+def _llm(model: str) -> BaseLlm:
+    """Model client for re-issuing a request to `model` (the request names the model the agent called)."""
+    return LLMRegistry.new_llm(model)
+
+
+async def _generate(llm_request: LlmRequest) -> LlmResponse:
+    responses = [response async for response in _llm(llm_request.model).generate_content_async(llm_request, stream=False)]
+    return responses[-1]
+
+
+class UsagePlugin(BasePlugin):
+    """
+    Attributes the token usage of model calls made inside tools to the calling agent and tool.
+
+    Records are stored in session state under "usage:<function call id>", so they are returned
+    with the run's events.
+    """
+
+    def __init__(self):
+        super().__init__(name="usage")
+
+    async def before_tool_callback(
+        self, *, tool: BaseTool, tool_args: dict[str, Any], tool_context: ToolContext
+    ) -> Optional[dict]:
+        usage.begin()
+        return None
+
+    async def after_tool_callback(
+        self, *, tool: BaseTool, tool_args: dict[str, Any], tool_context: ToolContext, result: dict
+    ) -> Optional[dict]:
+        records = usage.end()
+        if records:
+            tool_context.state[f"{usage.STATE_PREFIX}{tool_context.function_call_id}"] = [
+                {**r, "agent": tool_context.agent_name, "tool": tool.name} for r in records
+            ]
+        return None
+
+
+class OutputPolicyPlugin(BasePlugin):
+    """
+    Applies the per-tool output budgets of `output_policy` to every tool result.
+
+    The original and returned sizes are stored in session state under
+    "compaction:<function call id>".
+    """
+
+    def __init__(self):
+        super().__init__(name="output_policy")
+
+    async def after_tool_callback(
+        self, *, tool: BaseTool, tool_args: dict[str, Any], tool_context: ToolContext, result: dict
+    ) -> Optional[dict]:
+        compacted, original_size, compacted_size = output_policy.compact(tool.name, result)
+        tool_context.state[f"{COMPACTION_STATE_PREFIX}{tool_context.function_call_id}"] = {
+            "tool": tool.name,
+            "original_chars": original_size,
+            "returned_chars": compacted_size,
+        }
+        return compacted if compacted is not result else None
+
+
+class TracingPlugin(BasePlugin):
+    """
+    Emits spans for the invocation, every agent turn, model call and tool call when the
+    runner asked for a trace (session state "trace" = trace id) and the server has a trace
+    directory (TRACE_DIR). Ids that are not plain file names are ignored.
+    """
+
+    def __init__(self):
+        super().__init__(name="tracing")
+        self._tokens = {}  # invocation id -> tracing context token
+        self._spans = {}  # (kind, key) -> open span
+
+    async def before_run_callback(self, *, invocation_context: InvocationContext) -> None:
+        trace_id = invocation_context.session.state.get(tracing.STATE_KEY)
+        if tracing.TRACE_DIR and tracing.is_valid_trace_id(trace_id):
+            self._tokens[invocation_context.invocation_id] = tracing.start(trace_id, tracing.TRACE_DIR, "adk server")
+            self._spans[("run", invocation_context.invocation_id)] = tracing.begin_span(
+                "invocation", invocation_id=invocation_context.invocation_id, session_id=invocation_context.session.id
+            )
+        return None
+
+    async def after_run_callback(self, *, invocation_context: InvocationContext) -> None:
+        tracing.end_span(self._spans.pop(("run", invocation_context.invocation_id), None))
+        token = self._tokens.pop(invocation_context.invocation_id, None)
+        if token is not None:
+            tracing.stop(token)
+
+    async def before_agent_callback(self, *, agent: BaseAgent, callback_context: CallbackContext) -> None:
+        key = ("agent", callback_context.invocation_id, agent.name)
+        self._spans[key] = tracing.begin_span(f"agent {agent.name}", agent=agent.name)
+        return None
+
+    async def after_agent_callback(self, *, agent: BaseAgent, callback_context: CallbackContext) -> None:
+        tracing.end_span(self._spans.pop(("agent", callback_context.invocation_id, agent.name), None))
+        return None
+
+    async def before_model_callback(
+        self, *, callback_context: CallbackContext, llm_request: LlmRequest
+    ) -> Optional[LlmResponse]:
+        key = ("model", callback_context.invocation_id, callback_context.agent_name)
+        self._spans[key] = tracing.begin_span(
+            f"gemini {llm_request.model}", model=llm_request.model, agent=callback_context.agent_name,
+            contents=len(llm_request.contents),
+        )
+        return None
+
+    async def after_model_callback(
+        self, *, callback_context: CallbackContext, llm_response: LlmResponse
+    ) -> Optional[LlmResponse]:
+        tokens = usage.tokens_from_metadata(llm_response.usage_metadata)
+        tracing.end_span(
+            self._spans.pop(("model", callback_context.invocation_id, callback_context.agent_name), None),
+            prompt_tokens=tokens["prompt_tokens"], output_tokens=tokens["output_tokens"],
+        )
+        return None
+
+    async def on_model_error_callback(
+        self, *, callback_context: CallbackContext, llm_request: LlmRequest, error: Exception
+    ) -> Optional[LlmResponse]:
+        tracing.end_span(
+            self._spans.pop(("model", callback_context.invocation_id, callback_context.agent_name), None),
+            error=f"{type(error).__name__}: {error}",
+        )
+        return None
+
+    async def before_tool_callback(
+        self, *, tool: BaseTool, tool_args: dict[str, Any], tool_context: ToolContext
+    ) -> Optional[dict]:
+        self._spans[("tool", tool_context.function_call_id)] = tracing.begin_span(
+            f"tool {tool.name}", agent=tool_context.agent_name, args={k: str(v)[:200] for k, v in tool_args.items()}
+        )
+        return None
+
+    async def after_tool_callback(
+        self, *, tool: BaseTool, tool_args: dict[str, Any], tool_context: ToolContext, result: dict
+    ) -> Optional[dict]:
+        tracing.end_span(self._spans.pop(("tool", tool_context.function_call_id), None), result_chars=len(str(result)))
+        return None
+
+    async def on_tool_error_callback(
+        self, *, tool: BaseTool, tool_args: dict[str, Any], tool_context: ToolContext, error: Exception
+    ) -> Optional[dict]:
+        tracing.end_span(self._spans.pop(("tool", tool_context.function_call_id), None),
+                         error=f"{type(error).__name__}: {error}")
+        return None
+
+
+class AttachmentPrefetchPlugin(BasePlugin):
+    """
+    Extracts the question's attachments (session state "attachments") concurrently before
+    the first agent runs and stores their contents in session state under "attachment_context".
+
+    Per-file results are stored under "prefetch" and the token usage of the extraction
+    (e.g. `read_png`) under "usage:prefetch:<invocation id>".
+    """
+
+    def __init__(self):
+        super().__init__(name="attachment_prefetch")
+
+    async def before_agent_callback(self, *, agent: BaseAgent, callback_context: CallbackContext) -> None:
+        file_paths = callback_context.state.get(prefetch.ATTACHMENTS_STATE_KEY)
+        if not file_paths or callback_context.state.get(prefetch.CONTEXT_STATE_KEY) is not None:
+            return None
+
+        start = time.perf_counter()
+        usage.begin()
+        try:
+            extracted = await prefetch.prefetch(file_paths)
+        finally:
+            records = usage.end()
+
+        callback_context.state[prefetch.CONTEXT_STATE_KEY] = prefetch.format_context(extracted)
+        callback_context.state["prefetch"] = {
+            "latency": round(time.perf_counter() - start, 3),
+            "files": [{k: v for k, v in item.items() if k != "content"} for item in extracted],
+        }
+        if records:
+            callback_context.state[f"{usage.STATE_PREFIX}prefetch:{callback_context.invocation_id}"] = [
+                {**r, "agent": "prefetch", "tool": r["source"]} for r in records
+            ]
+        return None
+
+
+class RateLimitPlugin(BasePlugin):
+    """
+    Puts the agents' own model calls under the shared per-model rate limits of `ratelimit`
+    and retries rate-limited or failed calls with jittered exponential backoff.
+
+    A call waits for the rate limit only until the question's answer reserve starts; a call that
+    would wait longer becomes the agent's final answer (see `DeadlinePlugin`), which may wait
+    until the deadline itself.
+    """
+
+    def __init__(self):
+        super().__init__(name="rate_limit")
+
+    async def before_model_callback(
+        self, *, callback_context: CallbackContext, llm_request: LlmRequest
+    ) -> Optional[LlmResponse]:
+        bucket = ratelimit.limiter(llm_request.model)
+        try:
+            await asyncio.to_thread(bucket.acquire, ratelimit.max_wait())
+            return None
+        except deadline.DeadlineExceeded:
+            # No request allowed before the answer reserve: answer now instead of calling more tools
+            DeadlinePlugin.force_answer(callback_context, llm_request)
+        try:
+            await asyncio.to_thread(bucket.acquire, deadline.remaining())
+        except deadline.DeadlineExceeded:
+            return DeadlinePlugin.no_answer(callback_context)
+        return None
+
+    async def on_model_error_callback(
+        self, *, callback_context: CallbackContext, llm_request: LlmRequest, error: Exception
+    ) -> Optional[LlmResponse]:
+        bucket = ratelimit.limiter(llm_request.model)
+        for attempt in range(ratelimit.RETRY_ATTEMPTS - 1):
+            if not ratelimit.is_retryable(error):
+                break
+            delay = ratelimit.backoff_delay(attempt, error)
+            left = deadline.remaining()
+            if left is not None:
+                if left - delay < deadline.ANSWER_RESERVE:
+                    # No time for another attempt; DeadlinePlugin makes the agent answer instead
+                    break
+                llm_request.config.http_options = types.HttpOptions(
+                    timeout=int((left - delay - deadline.ANSWER_RESERVE) * 1000)
+                )
+            if ratelimit.status_code(error) == 429:
+                await asyncio.to_thread(bucket.pause, delay)
+            print(f"{llm_request.model}: {type(error).__name__}: {error} (retrying in {delay:.1f}s)")
+            await asyncio.sleep(delay)
+            try:
+                await asyncio.to_thread(bucket.acquire, ratelimit.max_wait())
+            except deadline.DeadlineExceeded:
+                # DeadlinePlugin makes the agent answer instead
+                break
+            try:
+                return await _generate(llm_request)
+            except Exception as e:
+                error = e
+        # Not retryable or out of attempts: ADK re-raises the original error
+        return None
+
+
+class DeadlinePlugin(BasePlugin):
+    """
+    Enforces the question's deadline (session state "deadline", set by the runner).
+
+    The deadline is made the deadline of the invocation's context, so tools and outbound calls
+    size their timeouts by it. Model calls get the remaining budget (minus a reserve for the final
+    answer) as HTTP timeout. Within `deadline.ANSWER_RESERVE` seconds of the deadline, or when a model
+    call timed out, the agent is asked to answer without tools from what it has gathered; after the
+    deadline, model and tool calls are skipped. Either way "deadline_exceeded" is set in session state.
+
+    Blocking tools are wrapped with `deadline.bounded` (see `agent.py`), so they run off the event
+    loop and a tool still running at the deadline fails with `DeadlineExceeded`.
+    """
+
+    FINAL_ANSWER_INSTRUCTION = (
+        "Time is up. Do not call any tools or transfer. "
+        "Give your best final answer now, using only the information you already have."
+    )
+
+    def __init__(self):
+        super().__init__(name="deadline")
+        self._tokens = {}  # invocation id -> deadline context token
+
+    async def before_run_callback(self, *, invocation_context: InvocationContext) -> None:
+        question_deadline = invocation_context.session.state.get(deadline.STATE_KEY)
+        if question_deadline:
+            self._tokens[invocation_context.invocation_id] = deadline.start(question_deadline)
+        return None
+
+    async def after_run_callback(self, *, invocation_context: InvocationContext) -> None:
+        token = self._tokens.pop(invocation_context.invocation_id, None)
+        if token is not None:
+            deadline.stop(token)
+
+    @classmethod
+    def force_answer(cls, callback_context: CallbackContext, llm_request: LlmRequest):
+        """Turn a model request into the final answer: no tools, answer from what was gathered."""
+        callback_context.state["deadline_exceeded"] = True
+        llm_request.config.tools = None
+        llm_request.config.tool_config = None
+        if cls.FINAL_ANSWER_INSTRUCTION not in str(llm_request.config.system_instruction or ""):
+            llm_request.append_instructions([cls.FINAL_ANSWER_INSTRUCTION])
+        llm_request.config.http_options = types.HttpOptions(timeout=deadline.timeout_ms())
+
+    @staticmethod
+    def no_answer(callback_context: CallbackContext) -> LlmResponse:
+        """Empty answer, for when the deadline passed."""
+        callback_context.state["deadline_exceeded"] = True
+        return LlmResponse(content=types.Content(role="model", parts=[types.Part(text="")]))
+
+    async def before_model_callback(
+        self, *, callback_context: CallbackContext, llm_request: LlmRequest
+    ) -> Optional[LlmResponse]:
+        left = deadline.remaining()
+        if left is None:
+            return None
+        if left <= 0:
+            return self.no_answer(callback_context)
+        if left <= deadline.ANSWER_RESERVE:
+            self.force_answer(callback_context, llm_request)
+        elif self.FINAL_ANSWER_INSTRUCTION not in str(llm_request.config.system_instruction or ""):
+            # Leave the reserve for a final answer if this call hangs
+            llm_request.config.http_options = types.HttpOptions(
+                timeout=int((left - deadline.ANSWER_RESERVE) * 1000)
+            )
+        return None
+
+    async def on_model_error_callback(
+        self, *, callback_context: CallbackContext, llm_request: LlmRequest, error: Exception
+    ) -> Optional[LlmResponse]:
+        left = deadline.remaining()
+        if left is None or not (ratelimit.is_retryable(error) or left <= deadline.ANSWER_RESERVE):
+            return None
+        if left <= 0:
+            return self.no_answer(callback_context)
+        self.force_answer(callback_context, llm_request)
+        try:
+            await asyncio.to_thread(ratelimit.limiter(llm_request.model).acquire, deadline.remaining())
+            return await _generate(llm_request)
+        except Exception as e:
+            print(f"Best-effort answer failed: {type(e).__name__}: {e}")
+            return self.no_answer(callback_context)
+
+    async def before_tool_callback(
+        self, *, tool: BaseTool, tool_args: dict[str, Any], tool_context: ToolContext
+    ) -> Optional[dict]:
+        left = deadline.remaining()
+        if left is not None and left <= 0:
+            tool_context.state["deadline_exceeded"] = True
+            return {"error": "Deadline exceeded: the tool was not run. Answer with the information you have."}
+        return None
+
+    async def on_tool_error_callback(
+        self, *, tool: BaseTool, tool_args: dict[str, Any], tool_context: ToolContext, error: Exception
+    ) -> Optional[dict]:
+        if isinstance(error, deadline.DeadlineExceeded):
+            tool_context.state["deadline_exceeded"] = True
+            return {"error": f"{error}. Answer with the information you have."}
+        return None
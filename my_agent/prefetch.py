@@ -0,0 +1,89 @@
+"""
+Attachment prefetch: extract the files attached to a question before the agent starts.
+
+Without prefetch the agent spends model turns deciding to call `pdf_extract`/`read_png`,
+one file after another. With prefetch the runner passes the file paths in session state
+("attachments"), all files are extracted concurrently, and their contents are put in
+session state ("attachment_context"), which the sub-agent instructions include.
+"""
+
+import asyncio
+import os
+import time
+
+from my_agent.tools import output_policy
+from my_agent.tools.pdf_extract import pdf_extract
+from my_agent.tools.read_png import read_png
+from utils import tracing
+
+# Session state keys: file paths from the runner, and the extracted contents for the instructions
+ATTACHMENTS_STATE_KEY = "attachments"
+CONTEXT_STATE_KEY = "attachment_context"
+
+# Extractor (tool name) per file extension
+EXTRACTORS = {
+    ".pdf": ("pdf_extract", pdf_extract),
+    ".png": ("read_png", read_png),
+}
+TEXT_EXTENSIONS = {".txt", ".md", ".csv", ".json", ".py", ".html", ".xml"}
+
+
+def _read_text(file_path: str) -> str:
+    with open(file_path, encoding="utf-8", errors="replace") as f:
+        return f.read()
+
+
+def extract_attachment(file_path: str) -> dict:
+    """
+    Extract the content of one attachment with the tool matching its type.
+
+    Returns:
+        Dictionary with the path, the tool used, the content (None if the file could not be
+        extracted), an error message if any and the latency in seconds
+    """
+    extension = os.path.splitext(file_path)[1].lower()
+    if extension in EXTRACTORS:
+        tool_name, extractor = EXTRACTORS[extension]
+    elif extension in TEXT_EXTENSIONS:
+        tool_name, extractor = "read_text", _read_text
+    else:
+        return {"path": file_path, "tool": None, "content": None, "error": f"Unsupported file type: {extension}"}
+
+    start = time.perf_counter()
+    result = {"path": file_path, "tool": tool_name, "content": None}
+    with tracing.span(f"prefetch {tool_name}", path=file_path) as span:
+        try:
+            content = extractor(file_path)
+        except Exception as e:
+            result["error"] = f"{type(e).__name__}: {e}"
+        else:
+            # The tools report failures as text starting with "ERROR"
+            if content.startswith("ERROR"):
+                result["error"] = content
+            else:
+                result["content"] = output_policy.truncate(content, output_policy.budget_for(tool_name))
+        span["chars"] = len(result["content"] or "")
+    result["latency"] = round(time.perf_counter() - start, 3)
+    return result
+
+
+async def prefetch(file_paths: list[str]) -> list[dict]:
+    """Extract all attachments concurrently (in threads, as the extractors block)."""
+    return list(await asyncio.gather(*(asyncio.to_thread(extract_attachment, path) for path in file_paths)))
+
+
+def format_context(extracted: list[dict]) -> str:
+    """
+    Format the extracted contents for the agent instructions. Files that could not be
+    extracted are left out, so the agent falls back to calling the tools itself.
+    """
+    sections = [
+        f"--- {item['path']} (extracted with {item['tool']}) ---\n{item['content']}"
+        for item in extracted if item["content"] is not None
+    ]
+    if not sections:
+        return ""
+    return (
+        "\n\nThe attached files were already extracted; use their contents below "
+        "instead of calling pdf_extract or read_png on them again.\n\n" + "\n\n".join(sections)
+    )
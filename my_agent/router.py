@@ -0,0 +1,274 @@
+"""
+Local question router.
+
+Picks the sub-agent for a question with a small TF-IDF nearest-centroid classifier
+instead of a root-agent LLM round-trip. The classifier is fit on the training
+questions (with their hand-labelled routes) plus a few seed examples per agent.
+Questions it is not confident about are handed to the LLM router.
+"""
+
+import json
+import math
+import os
+import re
+import time
+from collections import Counter
+from typing import AsyncGenerator, Dict, List, Optional, Tuple
+
+from google.adk.agents import BaseAgent
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.events import Event, EventActions
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+DATASET_PATH = os.path.join(REPO_ROOT, 'benchmark', 'train.json')
+
+# Minimum confidence for dispatching locally; below it the LLM router decides
+MIN_CONFIDENCE = float(os.getenv("ROUTER_MIN_CONFIDENCE", "0.05"))
+
+# Route of each question in benchmark/train.json, by index
+TRAINING_ROUTES = [
+    "reasoning_agent",        # 0  instruction following
+    "reasoning_agent",        # 1  fictional language translation
+    "reasoning_agent",        # 2  logic puzzle
+    "text_processing_agent",  # 3  TV trivia
+    "text_processing_agent",  # 4  text reconstruction
+    "math_agent",             # 5  fractions in an image
+    "math_agent",             # 6  pricing calculation
+    "reasoning_agent",        # 7  chess position
+    "math_agent",             # 8  counting rows in a PDF
+    "reasoning_agent",        # 9  choosing from a PDF listing
+    "text_processing_agent",  # 10 book lookup
+    "text_processing_agent",  # 11 film trivia
+    "text_processing_agent",  # 12 Olympics facts
+    "text_processing_agent",  # 13 report lookup
+    "text_processing_agent",  # 14 dissertation/museum lookup
+]
+
+# Seed examples mirroring the specializations listed in ROOT_INSTRUCTION
+SEED_EXAMPLES = {
+    "reasoning_agent": [
+        "Solve this logic puzzle using deductive reasoning",
+        "Follow the instructions exactly and ignore the questions in this prompt",
+        "Do not answer the questions, write only the word given in the instructions",
+        "Translate this sentence using the grammar rules of the fictional language",
+        "The verb comes first, followed by the object and the subject; use the nominative and accusative forms",
+        "Review the chess position and provide the next move in algebraic notation",
+        "You are a detective; some of the villagers always lie and the others always tell the truth",
+        "Based on the information in this file, which option is the better choice for the family",
+        "Given these constraints, which of the candidates satisfies all of the requirements",
+        "Riddle: figure out who is telling the truth and who is lying",
+    ],
+    "text_processing_agent": [
+        "Who wrote the book and in what year was it published",
+        "According to the article, what is the name of the author",
+        "According to chapter 2 of the book with this doi, which author influenced the scientist",
+        "Which country won the most medals at the Olympics; give the IOC country code",
+        "Reconstruct the sentence from these letters with no spaces",
+        "Pull out the sentence hidden in this block of text, reading left to right",
+        "In which episode of the TV series does the character appear, according to the script",
+        "In the film, what color was the object at the end of the movie",
+        "How many pages of the report mention the topic",
+        "The work referenced in the footnote of the dissertation is the source of the painting titles in the museum collection",
+        "Look up the date when the museum acquired the painting",
+    ],
+    "math_agent": [
+        "Calculate the total cost and round to two decimal places",
+        "How many items in the list satisfy the condition, give the number",
+        "How many of the books in the attached library list are checked out and not on the shelves",
+        "Simplify the fraction and compute the sum, difference, product",
+        "List all the fractions in the image and the answers to the sample problems",
+        "What is the average percentage per unit in dollars",
+        "I am over the storage limit of my plan; what is the average additional cost per file",
+        "Compute the price difference between the two subscription plans per month",
+        "Count the rows in the table that match the criteria",
+        "Solve the equation for x and report the result as a number",
+    ],
+}
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def _tokenize(text: str) -> List[str]:
+    """Lowercase word unigrams and bigrams."""
+    words = _TOKEN_RE.findall(text.lower())
+    return words + [f"{a}_{b}" for a, b in zip(words, words[1:])]
+
+
+class QuestionRouter:
+    """
+    TF-IDF nearest-centroid classifier over agent names.
+    """
+
+    def __init__(self):
+        self.idf: Dict[str, float] = {}
+        self.centroids: Dict[str, Dict[str, float]] = {}
+
+    def fit(self, questions: List[str], labels: List[str]) -> "QuestionRouter":
+        """Fit the IDF weights and one normalized centroid per label."""
+        documents = [Counter(_tokenize(q)) for q in questions]
+        doc_freq = Counter(term for doc in documents for term in doc)
+        n_docs = len(documents)
+        self.idf = {term: math.log((1 + n_docs) / (1 + df)) + 1 for term, df in doc_freq.items()}
+
+        sums: Dict[str, Counter] = {}
+        for doc, label in zip(documents, labels):
+            sums.setdefault(label, Counter()).update(self._vectorize(doc))
+        self.centroids = {label: self._normalize(vector) for label, vector in sums.items()}
+        return self
+
+    def _vectorize(self, counts: Counter) -> Dict[str, float]:
+        vector = {term: (1 + math.log(tf)) * self.idf[term] for term, tf in counts.items() if term in self.idf}
+        return self._normalize(vector)
+
+    @staticmethod
+    def _normalize(vector: Dict[str, float]) -> Dict[str, float]:
+        norm = math.sqrt(sum(v * v for v in vector.values()))
+        return {term: v / norm for term, v in vector.items()} if norm else {}
+
+    def scores(self, question: str) -> Dict[str, float]:
+        """Cosine similarity of the question to every agent centroid."""
+        vector = self._vectorize(Counter(_tokenize(question)))
+        return {
+            label: sum(weight * centroid.get(term, 0.0) for term, weight in vector.items())
+            for label, centroid in self.centroids.items()
+        }
+
+    def route(self, question: str) -> Tuple[Optional[str], float]:
+        """
+        Pick an agent for the question.
+
+        Returns:
+            Tuple of (agent_name, confidence), where confidence is the margin between the
+            best and second-best similarity. agent_name is None if nothing matched at all.
+        """
+        ranked = sorted(self.scores(question).items(), key=lambda item: item[1], reverse=True)
+        if not ranked or ranked[0][1] <= 0:
+            return None, 0.0
+        runner_up = ranked[1][1] if len(ranked) > 1 else 0.0
+        return ranked[0][0], ranked[0][1] - runner_up
+
+
+def load_training_examples(dataset_path: str = DATASET_PATH) -> Tuple[List[str], List[str]]:
+    """Seed examples plus the labelled training questions (if the dataset is available)."""
+    questions = [q for examples in SEED_EXAMPLES.values() for q in examples]
+    labels = [label for label, examples in SEED_EXAMPLES.items() for _ in examples]
+
+    try:
+        with open(dataset_path, "r") as f:
+            data = json.load(f)
+        dataset = data["dataset"] if isinstance(data, dict) else data
+    except (OSError, ValueError, KeyError):
+        dataset = []
+
+    for item, label in zip(dataset, TRAINING_ROUTES):
+        questions.append(item.get("question") or item.get("Question", ""))
+        labels.append(label)
+    return questions, labels
+
+
+def build_router(dataset_path: str = DATASET_PATH) -> QuestionRouter:
+    """Fit a router on the seed examples and the training set."""
+    return QuestionRouter().fit(*load_training_examples(dataset_path))
+
+
+class RouterAgent(BaseAgent):
+    """
+    Root agent that dispatches straight to a sub-agent when the local router is
+    confident, and falls back to the LLM router agent otherwise.
+
+    The routing decision is recorded in session state under "routing".
+    """
+
+    llm_router: BaseAgent
+    router: QuestionRouter
+    min_confidence: float = MIN_CONFIDENCE
+
+    async def _run_async_impl(self, ctx: InvocationContext) -> AsyncGenerator[Event, None]:
+        question = ""
+        if ctx.user_content and ctx.user_content.parts:
+            question = "".join(part.text or "" for part in ctx.user_content.parts)
+
+        start = time.perf_counter()
+        agent_name, confidence = self.router.route(question)
+        latency_ms = (time.perf_counter() - start) * 1000
+
+        target = self.llm_router.find_agent(agent_name) if agent_name else None
+        use_local = target is not None and confidence >= self.min_confidence
+
+        yield Event(
+            invocation_id=ctx.invocation_id,
+            author=self.name,
+            branch=ctx.branch,
+            actions=EventActions(state_delta={"routing": {
+                "method": "local" if use_local else "llm",
+                "agent": agent_name,
+                "confidence": round(confidence, 4),
+                "latency_ms": round(latency_ms, 3),
+            }}),
+        )
+
+        async for event in (target if use_local else self.llm_router).run_async(ctx):
+            yield event
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Report local routing decisions on the train dataset")
+    parser.add_argument("--compare-llm", action="store_true", help="Also ask the LLM router and report agreement")
+    args = parser.parse_args()
+
+    all_questions, all_labels = load_training_examples()
+    n_seed = len(all_questions) - len(TRAINING_ROUTES)
+
+    llm_route = None
+    if args.compare_llm:
+        import enum
+        import dotenv
+        from google import genai
+        from my_agent.agent import ROOT_INSTRUCTION
+
+        dotenv.load_dotenv(dotenv_path=os.path.join(REPO_ROOT, "my_agent", ".env"))
+        client = genai.Client(api_key=os.getenv("GOOGLE_API_KEY"))
+        AgentChoice = enum.Enum("AgentChoice", {name: name for name in SEED_EXAMPLES})
+
+        def llm_route(question: str) -> str:
+            response = client.models.generate_content(
+                model="gemini-2.5-flash-lite",
+                contents=f"{ROOT_INSTRUCTION}\n\nPick the sub-agent for this question.\n\nQuestion: {question}",
+                config={"response_mime_type": "text/x.enum", "response_schema": AgentChoice},
+            )
+            return response.text.strip()
+
+    agree_labels = agree_llm = 0
+    local_hits = local_correct = 0
+    latencies = []
+    for idx in range(len(all_questions) - n_seed):
+        question, label = all_questions[n_seed + idx], all_labels[n_seed + idx]
+        # Leave the question itself out so the report is not trivially perfect
+        held_out = [i for i in range(len(all_questions)) if i != n_seed + idx]
+        router = QuestionRouter().fit([all_questions[i] for i in held_out], [all_labels[i] for i in held_out])
+
+        start = time.perf_counter()
+        agent_name, confidence = router.route(question)
+        latencies.append((time.perf_counter() - start) * 1000)
+        agree_labels += agent_name == label
+        if confidence >= MIN_CONFIDENCE:
+            local_hits += 1
+            local_correct += agent_name == label
+
+        line = f"[{idx:2d}] {agent_name} (conf {confidence:.3f}, {latencies[-1]:.3f} ms) label={label}"
+        if llm_route:
+            llm_choice = llm_route(question)
+            agree_llm += agent_name == llm_choice
+            line += f" llm={llm_choice}"
+        print(line)
+
+    n = len(latencies)
+    if n:
+        print(f"\nLeave-one-out agreement with labels: {agree_labels}/{n}")
+        print(f"Routed locally (confidence >= {MIN_CONFIDENCE}): {local_hits}/{n},"
+              f" of which {local_correct} agree with the labels")
+        if llm_route:
+            print(f"Agreement with LLM router: {agree_llm}/{n}")
+        print(f"Routing latency: avg {sum(latencies) / n:.3f} ms, max {max(latencies):.3f} ms")
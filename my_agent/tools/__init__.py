@@ -3,3 +3,4 @@ from .pdf_extract import pdf_extract
 from .file_download import download_file, remove_file
 from .read_png import read_png
 from .text_processor import text_processor
+from .output_policy import read_more
@@ -6,6 +6,11 @@ import os
 import requests
 from typing import Tuple, Optional
 
+from utils import deadline, tracing
+
+# Download timeout in seconds, shortened to the question's remaining time budget
+DOWNLOAD_TIMEOUT = 30
+
 # Default download directory in the repo
 REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '../..'))
 DOWNLOADS_DIR = os.path.join(REPO_ROOT, 'downloads')
@@ -37,19 +42,28 @@ def download_file(url: str, save_dir: Optional[str] = None, filename: Optional[s
         
         file_path = os.path.join(safe_save_dir, filename)
         
-        response = requests.get(url, stream=True, timeout=30)
-        response.raise_for_status()
-        
-        with open(file_path, 'wb') as f:
-            for chunk in response.iter_content(chunk_size=8192):
-                if chunk:
-                    f.write(chunk)
+        with tracing.span("http GET", url=url) as span:
+            response = requests.get(url, stream=True, timeout=deadline.timeout(DOWNLOAD_TIMEOUT))
+            span["status"] = response.status_code
+            response.raise_for_status()
+            
+            size = 0
+            with open(file_path, 'wb') as f:
+                for chunk in response.iter_content(chunk_size=8192):
+                    # The timeout only bounds each read, so stop slow downloads at the deadline
+                    deadline.check()
+                    if chunk:
+                        f.write(chunk)
+                        size += len(chunk)
+            span["bytes"] = size
         
         if os.path.exists(file_path) and os.path.getsize(file_path) > 0:
             return True, file_path
         else:
             return False, f"ERROR: File was not created or is empty: {file_path}"
             
+    except deadline.DeadlineExceeded as e:
+        return False, f"ERROR: Download stopped, no time left: {e}"
     except requests.exceptions.RequestException as e:
         return False, f"ERROR: Network error during download: {type(e).__name__} - {e}"
     except OSError as e:
@@ -0,0 +1,168 @@
+"""
+Output size policy for tool results.
+
+Tool results end up in the agent's context and are re-sent with every following model
+turn, so each tool gets a character budget. Oversized text is truncated and the rest is
+kept behind a continuation handle that the agent can page through with `read_more`.
+Redundant fields (e.g. web search results once an answer was extracted) are dropped.
+"""
+
+import os
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, Tuple
+
+# Character budgets per tool (roughly 4 characters per token)
+DEFAULT_BUDGET = 8000
+TOOL_BUDGETS = {
+    "pdf_extract": 12000,
+    "read_png": 4000,
+    "text_processor": 4000,
+    "web_search": 3000,
+    "read_more": 12000,
+}
+
+# Override budgets with e.g. TOOL_OUTPUT_BUDGETS="pdf_extract=20000,read_png=2000"
+TOOL_BUDGETS.update(
+    (name.strip(), int(budget))
+    for name, _, budget in (item.partition("=") for item in os.getenv("TOOL_OUTPUT_BUDGETS", "").split(",") if item)
+)
+
+# Number of truncated outputs kept for paging
+MAX_STORED_OUTPUTS = 64
+
+# Web search results kept next to an extracted answer
+MAX_RESULTS_WITH_ANSWER = 3
+
+_stored_outputs: "OrderedDict[str, str]" = OrderedDict()
+
+
+def budget_for(tool_name: str) -> int:
+    return TOOL_BUDGETS.get(tool_name, DEFAULT_BUDGET)
+
+
+def _store(text: str) -> str:
+    handle = uuid.uuid4().hex[:12]
+    _stored_outputs[handle] = text
+    while len(_stored_outputs) > MAX_STORED_OUTPUTS:
+        _stored_outputs.popitem(last=False)
+    return handle
+
+
+def _page(text: str, offset: int, budget: int, handle: str) -> str:
+    """Return `budget` characters of text from `offset`, ending with a continuation note if more remains."""
+    end = offset + budget
+    if end >= len(text):
+        return text[offset:]
+
+    # Prefer to cut at a line break (or at least a space) in the last fifth of the page
+    cut = text.rfind("\n", offset + budget * 4 // 5, end)
+    if cut == -1:
+        cut = text.rfind(" ", offset + budget * 4 // 5, end)
+    end = cut if cut != -1 else end
+
+    return (
+        f"{text[offset:end]}\n\n[Truncated: showing characters {offset}-{end} of {len(text)}. "
+        f"Call read_more(handle='{handle}', offset={end}) for more.]"
+    )
+
+
+def truncate(text: str, budget: int) -> str:
+    """Truncate text to the budget, storing the full text for `read_more`."""
+    if len(text) <= budget:
+        return text
+    return _page(text, 0, budget, _store(text))
+
+
+def _compact_web_search(result: Dict[str, Any], budget: int) -> Dict[str, Any]:
+    answer = str(result.get("answer", ""))
+    results = result.get("results", [])
+    has_answer = answer and not answer.startswith(("Error", "Could not", "No search results"))
+
+    # Links are never used by the agent; with an answer in hand only the top snippets are context
+    snippets = [f"{r.get('title', '')}: {r.get('snippet', '')}" for r in results]
+    if has_answer:
+        snippets = snippets[:MAX_RESULTS_WITH_ANSWER]
+
+    compacted = {"search_query": result.get("search_query"), "answer": answer}
+    if "error" in result:
+        compacted["error"] = result["error"]
+    compacted["results"] = truncate("\n".join(snippets), max(budget - len(answer), 0))
+    return compacted
+
+
+def compact(tool_name: str, result: Any) -> Tuple[Any, int, int]:
+    """
+    Apply the output policy to a tool result.
+
+    Returns:
+        Tuple of (compacted result, original size in characters, compacted size in characters)
+    """
+    budget = budget_for(tool_name)
+    original_size = len(str(result))
+
+    if tool_name == "web_search" and isinstance(result, dict):
+        compacted = _compact_web_search(result, budget)
+    elif isinstance(result, str) and tool_name != "read_more":
+        compacted = truncate(result, budget)
+    else:
+        compacted = result
+
+    return compacted, original_size, len(str(compacted))
+
+
+def read_more(handle: str, offset: int) -> str:
+    """
+    Reads the next part of a tool output that was truncated.
+    Use it when a tool result ends with a "Truncated" note and you need the rest.
+
+    Args:
+        handle: The handle given in the truncation note
+        offset: The character offset to continue from, as given in the truncation note
+
+    Returns:
+        The next part of the output, with a new note if more remains
+    """
+    text = _stored_outputs.get(handle)
+    if text is None:
+        return f"ERROR: Unknown or expired handle: {handle}"
+    _stored_outputs.move_to_end(handle)
+    return _page(text, max(offset, 0), budget_for("read_more"), handle)
+
+
+if __name__ == "__main__":
+    # Measure the effect of the policy on the benchmark attachments and on typical large outputs.
+    # Tokens are estimated at 4 characters per token; a tool result is re-sent with every later
+    # model turn, so each token saved here is saved once per remaining turn.
+    import tempfile
+
+    import fitz
+
+    from my_agent.tools.pdf_extract import pdf_extract
+
+    def report(label, tool_name, result):
+        _, before, after = compact(tool_name, result)
+        print(f"{label}: {before} -> {after} characters (~{before // 4} -> ~{after // 4} tokens)")
+
+    attachments = os.path.join(os.path.dirname(__file__), "..", "..", "benchmark", "attachments")
+    for name in sorted(os.listdir(attachments)):
+        if name.endswith(".pdf"):
+            report(f"pdf_extract({name})", "pdf_extract", pdf_extract(os.path.join(attachments, name)))
+
+    paragraph = "The committee reviewed 1,204 submissions received in 2023 and published its findings in annex B. " * 10
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "report.pdf")
+        doc = fitz.open()
+        for _ in range(40):
+            doc.new_page().insert_textbox(fitz.Rect(50, 50, 550, 800), paragraph, fontsize=9)
+        doc.save(path)
+        doc.close()
+        report("pdf_extract(40-page report)", "pdf_extract", pdf_extract(path))
+
+    # A web_search result: AI overview blocks plus ten organic snippets, with an extracted answer
+    results = [{"title": "AI Overview", "snippet": paragraph[:600], "link": ""} for _ in range(3)]
+    results += [
+        {"title": f"Result {i}", "snippet": paragraph[:300], "link": f"https://example.org/{i}"} for i in range(10)
+    ]
+    report("web_search(13 snippets, answered)", "web_search",
+           {"search_query": "committee submissions 2023", "results": results, "answer": "1,204"})
@@ -6,6 +6,8 @@ import dotenv
 from google import genai
 from google.genai import types
 
+from utils import deadline, ratelimit, tracing, usage
+
 # Load environment variables from .env file
 dotenv.load_dotenv()
 
@@ -33,16 +35,22 @@ def read_png(file_path: str) -> str:
     with open(file_path, 'rb') as file:
         file_content = file.read()
 
-    response = client.models.generate_content(
-        model='gemini-2.5-flash-lite',
-        contents=[
-        types.Part.from_bytes(
-            data=file_content,
-            mime_type='image/png',
-        ),
-        'Describe this image in great detail.'
-        ]
-    )
+    with tracing.span('gemini gemini-2.5-flash-lite', source='read_png', bytes=len(file_content)):
+        response = ratelimit.call(
+            'gemini-2.5-flash-lite',
+            lambda: client.models.generate_content(
+                model='gemini-2.5-flash-lite',
+                contents=[
+                types.Part.from_bytes(
+                    data=file_content,
+                    mime_type='image/png',
+                ),
+                'Describe this image in great detail.'
+                ],
+                config=types.GenerateContentConfig(http_options=types.HttpOptions(timeout=deadline.timeout_ms())),
+            )
+        )
+    usage.record(response, 'gemini-2.5-flash-lite', 'read_png')
 
     return response.text
 
@@ -0,0 +1,180 @@
+"""
+Word segmentation engine used by the text processor.
+
+Wraps wordninja's language model with:
+- an LRU memo of previously segmented spans,
+- a batch API for segmenting many chunks,
+- windowed, streaming segmentation so long inputs use bounded memory,
+- custom vocabularies merged into the default word list.
+"""
+
+import functools
+import os
+import re
+from math import log
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+import wordninja
+
+# Same span separators as wordninja.split
+_SPLIT_RE = re.compile("[^a-zA-Z0-9']+")
+
+# Spans longer than this are segmented window by window
+DEFAULT_WINDOW = 512
+# Trailing characters of each window that are re-segmented with the next one,
+# so words near a window edge are decided with right-hand context
+DEFAULT_OVERLAP = 64
+DEFAULT_CACHE_SIZE = 4096
+
+
+class Segmenter:
+    """
+    Splits concatenated text into words with a wordninja language model.
+    """
+
+    def __init__(
+        self,
+        language_model: Optional[wordninja.LanguageModel] = None,
+        window: int = DEFAULT_WINDOW,
+        overlap: int = DEFAULT_OVERLAP,
+        cache_size: int = DEFAULT_CACHE_SIZE,
+    ):
+        """
+        Args:
+            language_model: wordninja model to use (defaults to wordninja's English model)
+            window: Maximum number of characters segmented in one dynamic-programming pass
+            overlap: Characters at the end of each window left for the next window to decide
+            cache_size: Number of segmented spans kept in the LRU memo
+        """
+        if overlap >= window:
+            raise ValueError(f"overlap ({overlap}) must be smaller than window ({window})")
+        self.language_model = language_model or wordninja.DEFAULT_LANGUAGE_MODEL
+        self.window = window
+        self.overlap = overlap
+        self._segment_span = functools.lru_cache(maxsize=cache_size)(self._segment_span_uncached)
+
+    @classmethod
+    def from_file(cls, word_file: str, **kwargs) -> "Segmenter":
+        """
+        Segmenter using a gzipped word list ordered by frequency (wordninja's format).
+        """
+        return cls(wordninja.LanguageModel(word_file), **kwargs)
+
+    @classmethod
+    def from_words(cls, words: Iterable[str], base: Optional[wordninja.LanguageModel] = None, **kwargs) -> "Segmenter":
+        """
+        Segmenter whose vocabulary is the base model's plus `words`.
+
+        Custom words are ranked ahead of the base vocabulary (most important first), so
+        domain terms such as names are kept whole rather than split into common words.
+        """
+        base = base or wordninja.DEFAULT_LANGUAGE_MODEL
+        words = [w.lower() for w in words if w]
+
+        model = wordninja.LanguageModel.__new__(wordninja.LanguageModel)
+        model._wordcost = dict(base._wordcost)
+        total = len(model._wordcost) + len(words)
+        for rank, word in enumerate(words):
+            # Same Zipf cost as wordninja uses for the rank-th word of the list
+            cost = log((rank + 1) * log(total))
+            model._wordcost[word] = min(cost, model._wordcost.get(word, cost))
+        model._maxword = max([base._maxword] + [len(w) for w in words])
+        return cls(model, **kwargs)
+
+    def cache_info(self):
+        """Hit/miss statistics of the span memo."""
+        return self._segment_span.cache_info()
+
+    def _segment_span_uncached(self, span: str) -> Tuple[str, ...]:
+        return tuple(self.language_model._split(span))
+
+    def split(self, text: str) -> List[str]:
+        """Split a string into words (equivalent to `wordninja.split`, but memoized and windowed)."""
+        return list(self.iter_words([text]))
+
+    def split_batch(self, chunks: Iterable[str]) -> List[List[str]]:
+        """Split many independent chunks; repeated chunks are served from the memo."""
+        return [self.split(chunk) for chunk in chunks]
+
+    def _commit_window(self, buffer: str) -> Tuple[int, List[str]]:
+        """
+        Segment the first window of `buffer` and keep the words that end before the overlap.
+
+        Returns:
+            Tuple of (number of characters consumed, committed words)
+        """
+        limit = self.window - self.overlap
+        committed, words = 0, []
+        for word in self._segment_span(buffer[:self.window]):
+            end = buffer.find(word, committed) + len(word)
+            if words and end > limit:
+                break
+            words.append(word)
+            committed = end
+        # Always make progress, even if the model returned nothing usable
+        return max(committed, 1), words
+
+    def iter_words(self, pieces: Iterable[str]) -> Iterator[str]:
+        """
+        Stream words from an iterable of text pieces that together form one text.
+
+        Pieces are concatenated (a word may continue across pieces) and only about one
+        window of text is held in memory at a time.
+        """
+        buffer = ""
+        for piece in pieces:
+            for index, span in enumerate(_SPLIT_RE.split(piece)):
+                if index > 0 and buffer:
+                    # A separator ends the current span
+                    yield from self._segment_span(buffer)
+                    buffer = ""
+                for start in range(0, len(span), self.window):
+                    buffer += span[start:start + self.window]
+                    while len(buffer) >= self.window:
+                        consumed, words = self._commit_window(buffer)
+                        yield from words
+                        buffer = buffer[consumed:]
+        if buffer:
+            yield from self._segment_span(buffer)
+
+
+@functools.lru_cache(maxsize=1)
+def default_segmenter() -> Segmenter:
+    """Shared segmenter, with an optional custom vocabulary from SEGMENTATION_VOCAB (one word per line)."""
+    vocab_path = os.getenv("SEGMENTATION_VOCAB")
+    if vocab_path:
+        with open(vocab_path, "r") as f:
+            return Segmenter.from_words(line.strip() for line in f)
+    return Segmenter()
+
+
+if __name__ == "__main__":
+    # Throughput benchmark against a single monolithic wordninja.split pass
+    import time
+    import tracemalloc
+
+    sentence = "theseagullglidedpeacefullytomychairwhilethesunsetoverthequietharbour"
+
+    def measure(label, fn, n_chars):
+        tracemalloc.start()
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print(f"{label:<45} {n_chars / elapsed / 1e3:10.1f} kchar/s  peak {peak / 1e6:8.2f} MB")
+
+    long_text = sentence * 2000
+    measure("long input: wordninja.split", lambda: wordninja.split(long_text), len(long_text))
+    # No memo here, so repeated windows of the periodic input do not flatter the streaming path
+    measure("long input: Segmenter.iter_words (streaming)",
+            lambda: sum(1 for _ in Segmenter(cache_size=0).iter_words([long_text])), len(long_text))
+
+    chunks = [sentence[i:i + 35] for i in range(0, len(sentence), 35)] * 500
+    n_chars = sum(len(c) for c in chunks)
+    measure("repeated chunks: wordninja.split", lambda: [wordninja.split(c) for c in chunks], n_chars)
+    measure("repeated chunks: Segmenter.split_batch", lambda: Segmenter().split_batch(chunks), n_chars)
+
+    segmenter = Segmenter()
+    matches = segmenter.split(long_text) == wordninja.split(long_text)
+    print(f"\nStreaming output identical to wordninja.split: {matches}")
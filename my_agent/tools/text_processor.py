@@ -5,25 +5,25 @@ This tool takes text chunks (strings without spaces) and reconstructs them
 into readable sentences by intelligently inserting word boundaries.
 """
 
-import wordninja
+from my_agent.tools.segmentation import default_segmenter
 
 
 def text_processor(text_chunk: str) -> str:
     """
     Reconstructs a sentence from a text chunk by inserting spaces between words.
     """
-    # Normalize input to string (handle edge cases)
+    # Normalize input to a sequence of pieces forming one text (handle edge cases)
     if isinstance(text_chunk, list):
-        # If list provided, join into single string
-        combined_text = ''.join(str(line).strip() for line in text_chunk).lower()
+        # If list provided, the lines are read in order as one continuous text
+        pieces = (str(line).strip().lower() for line in text_chunk)
     elif isinstance(text_chunk, str):
-        combined_text = text_chunk.strip().lower()
+        pieces = [text_chunk.strip().lower()]
     else:
         # Convert to string if needed
-        combined_text = str(text_chunk).strip().lower()
+        pieces = [str(text_chunk).strip().lower()]
     
-    # Split the concatenated text into words using wordninja
-    words = wordninja.split(combined_text)
+    # Split the concatenated text into words, streaming long inputs window by window
+    words = default_segmenter().iter_words(pieces)
     
     # Reconstruct the sentence
     sentence = ' '.join(words)
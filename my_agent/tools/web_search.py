@@ -7,17 +7,24 @@ import dotenv
 from pathlib import Path
 from typing import Dict, Any, List
 
+from utils import deadline, ratelimit, tracing, usage
+
 # Load environment variables
 dotenv.load_dotenv()
 
 SERP_API_KEY = os.getenv("SERP_API_KEY")
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
 
-# Timeout configuration (in seconds)
+# Timeout configuration (in seconds); shortened to the question's remaining time budget
 REQUEST_TIMEOUT = 180
 
+# Models tried in order for query generation; with MODEL_CASCADE=1 flash goes first and pro
+# is only used when flash returns an unusable query
+QUERY_MODELS = ["gemini-2.5-flash", "gemini-2.5-pro"] if os.getenv("MODEL_CASCADE", "0") == "1" else ["gemini-2.5-pro"]
+MAX_QUERY_CHARS = 200
+
 # Initialize Gemini client
-client = genai.Client(api_key=GOOGLE_API_KEY)
+client = genai.Client(api_key=GOOGLE_API_KEY) if GOOGLE_API_KEY else None
 
 # Prompts
 QUERY_TRANSFORM_PROMPT = """Transform questions into effective search queries.
@@ -28,53 +35,86 @@ Answer format: only extract the meaningful English word from the context and rel
 """
 
 # Core helper
-def extract(prompt: str, content: str, model: str = "gemini-2.5-flash") -> str:
+def extract(prompt: str, content: str, model: str = "gemini-2.5-flash", source: str = "extract") -> str:
     try:
-        response = client.models.generate_content(
-            model=model,
-            contents=f"{prompt}\n\n{content}"
-        )
+        if client is None:
+            raise ValueError("GOOGLE_API_KEY environment variable is not set.")
+        with tracing.span(f"gemini {model}", source=source, prompt_chars=len(prompt) + len(content)) as span:
+            response = ratelimit.call(
+                model,
+                lambda: client.models.generate_content(
+                    model=model,
+                    contents=f"{prompt}\n\n{content}",
+                    config={"http_options": {"timeout": deadline.timeout_ms()}},
+                )
+            )
+            span["output_chars"] = len(response.text or "")
+        usage.record(response, model, source)
         return response.text.strip()
     except Exception as e:
         print(f"Error in extract: {e}")
         return ""
 
+def is_valid_query(query: str) -> bool:
+    """A usable search query is a single, reasonably short line."""
+    return bool(query) and "\n" not in query and len(query) <= MAX_QUERY_CHARS
+
 def generate_search_query(question: str) -> str:
     try:
-        result = extract(QUERY_TRANSFORM_PROMPT, question, model="gemini-2.5-pro")
+        result = ""
+        for model in QUERY_MODELS:
+            result = extract(QUERY_TRANSFORM_PROMPT, question, model=model, source="generate_search_query")
+            if is_valid_query(result):
+                break
         return result
     except Exception as e:
         print(f"Error in transform_query: {e}")
 
+def serpapi_search(params: Dict[str, Any]) -> Dict[str, Any]:
+    """Run a SerpAPI search within the shared SerpAPI rate limit, retrying rate limits and server errors."""
+    search = GoogleSearch({**params, "api_key": SERP_API_KEY})
+
+    def get_dict() -> Dict[str, Any]:
+        # The client's own default timeout is 60000 seconds
+        search.timeout = deadline.timeout(REQUEST_TIMEOUT)
+        # GoogleSearch.get_dict() hides the HTTP status, so check it here
+        response = search.get_response()
+        if response.status_code in ratelimit.RETRYABLE_STATUS_CODES:
+            raise ratelimit.RetryableError(f"SerpAPI returned HTTP {response.status_code}", response.status_code)
+        return response.json()
+
+    return ratelimit.call("serpapi", get_dict)
+
 def search_google(query: str) -> Dict[str, Any]:
     try:
-        search = GoogleSearch({"q": query, "api_key": SERP_API_KEY, "num": 10, "timeout": REQUEST_TIMEOUT})
-        return search.get_dict()
+        with tracing.span("serpapi search", query=query) as span:
+            results = serpapi_search({"q": query, "num": 10})
+            span["organic_results"] = len(results.get("organic_results", []))
+        return results
     except Exception as e:
         print(f"Error searching: {e}")
         return {"error": str(e)}
 
 def get_ai_overview(query: str) -> List[str]:
     try:
-        search = GoogleSearch({"q": query, "api_key": SERP_API_KEY, "timeout": REQUEST_TIMEOUT})
-        results = search.get_dict()
+        with tracing.span("serpapi search (ai overview token)", query=query):
+            results = serpapi_search({"q": query})
 
         if "ai_overview" not in results or "page_token" not in results["ai_overview"]:
             return []
 
-        ai_search = GoogleSearch({
-            "engine": "google_ai_overview",
-            "page_token": results["ai_overview"]["page_token"],
-            "api_key": SERP_API_KEY,
-            "timeout": REQUEST_TIMEOUT
-        })
-        ai_results = ai_search.get_dict()
+        with tracing.span("serpapi google_ai_overview", query=query):
+            ai_results = serpapi_search({
+                "engine": "google_ai_overview",
+                "page_token": results["ai_overview"]["page_token"],
+            })
 
         if "ai_overview" in ai_results and "text_blocks" in ai_results["ai_overview"]:
             return [block["snippet"] for block in ai_results["ai_overview"]["text_blocks"] if "snippet" in block]
 
         return []
-    except:
+    except Exception as e:
+        print(f"Error getting AI overview: {e}")
         return []
 
 def extract_snippets(results: Dict[str, Any]) -> List[Dict[str, str]]:
@@ -104,18 +144,20 @@ def extract_snippets(results: Dict[str, Any]) -> List[Dict[str, str]]:
 
     return snippets
 
-def extract_answer(question: str, snippets: List[Dict[str, str]]) -> str:
-    if not snippets:
-        return "No search results found."
-
+def build_context(question: str, snippets: List[Dict[str, str]]) -> str:
+    """Answer extraction prompt content: the question and the top 10 snippets, numbered."""
     context_parts = []
     for i, s in enumerate(snippets[:10], 1):
         context_parts.append(f"[{i}] Title: {s['title']}\nContent: {s['snippet']}")
 
     context = "\n\n".join(context_parts)
-    content = f"Question: {question}\n\nContext:\n{context}"
+    return f"Question: {question}\n\nContext:\n{context}"
+
+def extract_answer(question: str, snippets: List[Dict[str, str]]) -> str:
+    if not snippets:
+        return "No search results found."
 
-    answer = extract(ANSWER_EXTRACTION_PROMPT, content)
+    answer = extract(ANSWER_EXTRACTION_PROMPT, build_context(question, snippets), source="extract_answer")
 
     return answer if answer else "Could not extract answer."
 
@@ -0,0 +1,100 @@
+"""
+Stub agent for load tests: replays recorded answers and latencies instead of calling models.
+
+Answers and response times are read from an evaluation results file (STUB_RESULTS, default
+`my_results.json`) and looked up by question, so `adk api_server` and the runner can be
+stress-tested at production arrival rates without live models or API quotas.
+"""
+
+import asyncio
+import json
+import os
+import random
+import time
+from typing import AsyncGenerator
+
+from google.adk.agents import BaseAgent
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.apps import App
+from google.adk.events import Event, EventActions
+from google.genai import types
+
+from utils import cache, deadline
+
+RESULTS_PATH = os.getenv("STUB_RESULTS", "my_results.json")
+
+# Multiplier on the recorded response times (e.g. 0.1 to replay ten times faster)
+LATENCY_SCALE = float(os.getenv("STUB_LATENCY_SCALE", "1.0"))
+
+# Fraction of runs that fail with an error, to exercise error handling under load
+ERROR_RATE = float(os.getenv("STUB_ERROR_RATE", "0"))
+
+# The runner appends the attachment paths to the question text
+ATTACHMENT_NOTE = "\n\nNote: The following files are relevant:"
+
+
+def load_recordings(path: str) -> dict:
+    """
+    Map normalized question text to its recorded answer and response time.
+
+    Returns:
+        Empty dict if the results file does not exist
+    """
+    try:
+        with open(path) as f:
+            results = json.load(f)["results"]
+    except FileNotFoundError:
+        return {}
+    return {
+        cache.normalize_question(r["question"]): {"answer": r["agent_response"], "latency": r["response_time"]}
+        for r in results
+    }
+
+
+class StubAgent(BaseAgent):
+    """
+    Answers with the recorded answer after the recorded response time. Unknown questions get
+    a placeholder answer after the average recorded response time. A deadline in session state
+    cuts the wait short and marks the run as timed out, like the real agent's DeadlinePlugin.
+    """
+
+    recordings: dict = {}
+
+    async def _run_async_impl(self, ctx: InvocationContext) -> AsyncGenerator[Event, None]:
+        question = ""
+        if ctx.user_content and ctx.user_content.parts:
+            question = "".join(part.text or "" for part in ctx.user_content.parts)
+        question = question.split(ATTACHMENT_NOTE)[0]
+
+        latencies = [r["latency"] for r in self.recordings.values()]
+        default_latency = sum(latencies) / len(latencies) if latencies else 1.0
+        recording = self.recordings.get(cache.normalize_question(question))
+        answer, latency = (recording["answer"], recording["latency"]) if recording else ("stub answer", default_latency)
+        latency *= LATENCY_SCALE
+
+        state_delta = {}
+        question_deadline = ctx.session.state.get(deadline.STATE_KEY)
+        if question_deadline is not None and time.time() + latency > question_deadline:
+            latency = max(question_deadline - time.time(), 0)
+            state_delta["deadline_exceeded"] = True
+        await asyncio.sleep(latency)
+
+        if random.random() < ERROR_RATE:
+            raise RuntimeError("Stub agent: injected failure")
+
+        yield Event(
+            invocation_id=ctx.invocation_id,
+            author=self.name,
+            branch=ctx.branch,
+            content=types.Content(role="model", parts=[types.Part(text="" if state_delta else answer)]),
+            actions=EventActions(state_delta=state_delta),
+        )
+
+
+root_agent = StubAgent(
+    name="stub_agent",
+    description="Replays recorded answers and latencies for load tests.",
+    recordings=load_recordings(RESULTS_PATH),
+)
+
+app = App(name="stub_agent", root_agent=root_agent)
@@ -0,0 +1,141 @@
+"""
+Persistent key-value cache backed by SQLite.
+Used to skip repeated agent runs for identical questions and attachments.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+
+CACHE_DIR = ".cache"
+
+
+class PersistentCache:
+    """
+    JSON value cache stored in a SQLite file, with per-entry expiry and hit-rate counters.
+    Safe to share between threads and processes.
+    """
+
+    def __init__(self, path: str, ttl: float | None = None):
+        """
+        Args:
+            path: Path of the SQLite file (created if missing)
+            ttl: Time-to-live of entries in seconds (None = never expire)
+        """
+        self.path = path
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=30)
+
+    def get(self, key: str):
+        """Return the cached value for `key`, or None if missing or expired."""
+        with self._connect() as conn:
+            row = conn.execute("SELECT value, created FROM cache WHERE key = ?", (key,)).fetchone()
+
+        if row is not None and (self.ttl is None or time.time() - row[1] <= self.ttl):
+            with self._lock:
+                self.hits += 1
+            return json.loads(row[0])
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def set(self, key: str, value):
+        """Store a JSON-serializable value under `key`."""
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, created) VALUES (?, ?, ?)",
+                (key, json.dumps(value), time.time()),
+            )
+
+    def purge_expired(self) -> int:
+        """Delete expired entries and return how many were removed."""
+        if self.ttl is None:
+            return 0
+        with self._connect() as conn:
+            return conn.execute("DELETE FROM cache WHERE created < ?", (time.time() - self.ttl,)).rowcount
+
+    def stats(self) -> dict:
+        """Hit/miss counters of this cache instance."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0,
+        }
+
+
+def normalize_question(question: str) -> str:
+    """Normalize unicode forms and whitespace so trivially different copies of a question match."""
+    return " ".join(unicodedata.normalize("NFKC", question).split())
+
+
+def file_sha256(file_path: str) -> str:
+    """SHA-256 of a file's content."""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def answer_key(question: str, file_paths: list[str] | None = None, namespace: str = "") -> str:
+    """
+    Cache key for an agent answer.
+
+    Args:
+        question: The question text (normalized before hashing)
+        file_paths: Referenced files; their content hashes are part of the key, their paths are not
+        namespace: Extra key component, e.g. the agent name and code version
+
+    Returns:
+        Hex digest identifying the question, attachments and namespace
+    """
+    parts = [namespace, normalize_question(question)]
+    parts += sorted(file_sha256(path) for path in file_paths or [])
+    return hashlib.sha256("\x00".join(parts).encode("utf-8")).hexdigest()
+
+
+def judge_key(question: str, expected_answer: str, response: str, namespace: str = "") -> str:
+    """
+    Cache key for an LLM judge verdict.
+
+    Args:
+        question: The question text (normalized before hashing)
+        expected_answer: The expected answer
+        response: The agent's response
+        namespace: Extra key component, e.g. the judge model and prompt version
+
+    Returns:
+        Hex digest identifying the verdict
+    """
+    parts = [namespace, normalize_question(question), expected_answer.strip(), response.strip()]
+    return hashlib.sha256("\x00".join(parts).encode("utf-8")).hexdigest()
+
+
+def directory_fingerprint(directory: str) -> str:
+    """Hash of all Python sources under a directory, used to invalidate answers when the agent changes."""
+    digest = hashlib.sha256()
+    if os.path.isdir(directory):
+        for root, dirs, files in os.walk(directory):
+            dirs[:] = sorted(d for d in dirs if d != "__pycache__")
+            for name in sorted(files):
+                if name.endswith(".py"):
+                    path = os.path.join(root, name)
+                    digest.update(os.path.relpath(path, directory).encode("utf-8"))
+                    digest.update(file_sha256(path).encode("ascii"))
+    return digest.hexdigest()[:16]
@@ -0,0 +1,198 @@
+"""
+Streaming benchmark dataset loading and sharding.
+
+Datasets are either JSON (a list of questions, or `{"dataset": [...]}`) or JSONL (one
+question per line). Questions are yielded one at a time with their index in the full
+dataset, so large datasets are never loaded at once and shard results can be merged
+back in dataset order.
+"""
+
+import json
+from typing import Iterator, TextIO, Tuple
+
+# Characters read from the file at a time when streaming JSON
+CHUNK_SIZE = 1 << 16
+
+_decoder = json.JSONDecoder()
+
+
+def parse_shard(spec: str) -> Tuple[int, int]:
+    """
+    Parse a shard specification "i/n" (0-based shard i of n).
+
+    Raises:
+        ValueError: If the specification is malformed or i is not in [0, n)
+    """
+    index, _, count = spec.partition("/")
+    try:
+        index, count = int(index), int(count)
+    except ValueError:
+        raise ValueError(f"Invalid shard '{spec}', expected i/n, e.g. 0/4")
+    if count < 1 or not 0 <= index < count:
+        raise ValueError(f"Invalid shard '{spec}': i must be in [0, n)")
+    return index, count
+
+
+def in_shard(question_idx: int, shard: Tuple[int, int] | None) -> bool:
+    """Questions are dealt round-robin, so every shard gets a similar mix of questions."""
+    return shard is None or question_idx % shard[1] == shard[0]
+
+
+def unpack_question(item: dict, attachments_dir: str) -> Tuple[str, str, list[str] | None]:
+    """
+    Read a question in either dataset format: verbose ("Question", "Final answer") or
+    simple ("question", "answer"), with an optional comma-separated "file_name".
+
+    Returns:
+        Tuple of (question, expected answer, attachment paths or None)
+    """
+    if "Question" in item:  # verbose format
+        question, expected_answer = item["Question"], item["Final answer"]
+    else:  # simple format
+        question, expected_answer = item["question"], item["answer"]
+
+    files = [f.strip() for f in item.get("file_name", "").split(",") if f.strip()]
+    file_paths = [f"{attachments_dir}/{f}" for f in files] or None
+    return question, expected_answer, file_paths
+
+
+def _skip_whitespace(buffer: str, position: int) -> int:
+    while position < len(buffer) and buffer[position].isspace():
+        position += 1
+    return position
+
+
+def _iter_json_array(f: TextIO) -> Iterator[dict]:
+    """Yield the items of the dataset array of a JSON file, decoding one item at a time."""
+    buffer = ""
+    position = 0
+    eof = False
+
+    def fill() -> bool:
+        nonlocal buffer, position, eof
+        chunk = f.read(CHUNK_SIZE)
+        eof = not chunk
+        buffer = buffer[position:] + chunk
+        position = 0
+        return not eof
+
+    def peek() -> str:
+        """Next non-whitespace character, reading more of the file as needed ("" at the end of the file)."""
+        nonlocal position
+        while True:
+            position = _skip_whitespace(buffer, position)
+            if position < len(buffer):
+                return buffer[position]
+            if not fill():
+                return ""
+
+    def decode():
+        """Decode the JSON value at the current position, reading more of the file until it is complete."""
+        nonlocal position
+        peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError as e:
+                # Most likely the value continues in the next chunk
+                if eof:
+                    raise ValueError(f"Invalid JSON in dataset file: {e}")
+                fill()
+                continue
+            # A number at the end of the buffer may continue in the next chunk
+            if end == len(buffer) and not eof:
+                fill()
+                continue
+            position = end
+            return value
+
+    def expect(characters: str) -> str:
+        nonlocal position
+        character = peek()
+        if not character or character not in characters:
+            raise ValueError('Invalid dataset file: expected a list or {"dataset": [...]}')
+        position += 1
+        return character
+
+    # Find the start of the question list: the top-level list, or the value of the top-level
+    # "dataset" key, skipping the other keys' values whole (they may contain lists too)
+    if expect("[{") == "{":
+        while True:
+            if peek() == "}":
+                raise ValueError('Invalid dataset file: no "dataset" key found')
+            if peek() != '"':
+                raise ValueError("Invalid dataset file: expected a key in the top-level object")
+            key = decode()
+            expect(":")
+            if key == "dataset":
+                expect("[")
+                break
+            decode()
+            if expect(",}") == "}":
+                raise ValueError('Invalid dataset file: no "dataset" key found')
+
+    while True:
+        character = peek()
+        if not character:
+            raise ValueError("Invalid dataset file: unexpected end of file")
+        if character == "]":
+            return
+        if character == ",":
+            position += 1
+            continue
+        yield decode()
+
+
+def iter_dataset(path: str) -> Iterator[Tuple[int, dict]]:
+    """
+    Yield (question index, question) for every question in a JSON or JSONL dataset.
+
+    Raises:
+        FileNotFoundError: If the dataset file does not exist
+        ValueError: If the file is not valid JSON/JSONL
+    """
+    try:
+        f = open(path, "r")
+    except FileNotFoundError:
+        raise FileNotFoundError(f"Dataset file not found: {path}")
+
+    with f:
+        if path.endswith(".jsonl"):
+            index = 0
+            for line_number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    yield index, json.loads(line)
+                except json.JSONDecodeError as e:
+                    raise ValueError(f"Invalid JSON on line {line_number} of {path}: {e}")
+                index += 1
+        else:
+            yield from enumerate(_iter_json_array(f))
+
+
+if __name__ == "__main__":
+    import io
+
+    # Regression cases: the dataset list after other keys holding lists, every layout, and
+    # tiny chunks so that keys, values and items span several reads
+    questions = [{"question": "What is 2 + 2? [easy]", "answer": "4"}, {"question": "Capital of France?", "answer": "Paris"}]
+    layouts = {
+        "list": json.dumps(questions),
+        "object": json.dumps({"dataset": questions}),
+        "keys before dataset": json.dumps({"kind": "dataset", "tags": ["hard"], "size": 12345, "dataset": questions}),
+        "nested dataset key": json.dumps({"meta": {"dataset": [{"question": "decoy"}]}, "dataset": questions}),
+        "empty": json.dumps({"dataset": []}),
+    }
+    for chunk_size in (1, 3, 7, CHUNK_SIZE):
+        CHUNK_SIZE = chunk_size
+        for name, text in layouts.items():
+            expected = [] if name == "empty" else questions
+            assert list(_iter_json_array(io.StringIO(text))) == expected, f"{name}, chunk size {chunk_size}"
+        for text in ('{"kind": "dataset"}', '{"tags": ["hard"]', "42"):
+            try:
+                list(_iter_json_array(io.StringIO(text)))
+            except ValueError:
+                continue
+            raise AssertionError(f"{text} was accepted")
+    print(f"{len(layouts)} layouts parsed correctly")
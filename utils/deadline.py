@@ -0,0 +1,113 @@
+"""
+Per-question deadlines.
+
+`evaluate.py` gives each question a time budget. The runner turns it into an absolute
+deadline (wall-clock time, so it means the same in every process), sizes its HTTP timeout
+by it and passes it to the server in session state ("deadline"). There the `DeadlinePlugin`
+makes it the deadline of the invocation's context, so every tool and outbound call can size
+its timeout by the remaining budget with `timeout()`, and the agent is made to answer with
+what it has before the deadline instead of hanging.
+"""
+
+import asyncio
+import contextlib
+import contextvars
+import functools
+import time
+
+# Session state key carrying the deadline (seconds since the epoch) from the runner to the server
+STATE_KEY = "deadline"
+
+# Seconds before the deadline at which the agent must stop calling tools and answer
+ANSWER_RESERVE = 15
+
+_deadline = contextvars.ContextVar("deadline", default=None)
+
+
+class DeadlineExceeded(TimeoutError):
+    """The question's deadline passed."""
+
+
+def start(deadline: float | None) -> contextvars.Token:
+    """
+    Set the deadline of the current context.
+
+    Returns:
+        Token to pass to `stop`
+    """
+    return _deadline.set(deadline)
+
+
+def stop(token: contextvars.Token):
+    """Restore the previous deadline of the current context."""
+    _deadline.reset(token)
+
+
+@contextlib.contextmanager
+def scope(deadline: float | None):
+    """Context manager form of `start`/`stop`."""
+    token = start(deadline)
+    try:
+        yield
+    finally:
+        stop(token)
+
+
+def get() -> float | None:
+    return _deadline.get()
+
+
+def remaining() -> float | None:
+    """Seconds left until the deadline, or None without a deadline."""
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.time()
+
+
+def check():
+    """Raise `DeadlineExceeded` if the deadline passed."""
+    left = remaining()
+    if left is not None and left <= 0:
+        raise DeadlineExceeded(f"Deadline exceeded by {-left:.1f}s")
+
+
+def timeout(default: float | None = None) -> float | None:
+    """
+    Timeout in seconds for a blocking call: `default`, shortened to the remaining budget.
+
+    Raises:
+        DeadlineExceeded: If the deadline already passed
+    """
+    check()
+    left = remaining()
+    if left is None:
+        return default
+    return left if default is None else min(default, left)
+
+
+def timeout_ms(default: float | None = None) -> int | None:
+    """`timeout` in milliseconds, as Gemini's `http_options` expect."""
+    seconds = timeout(default)
+    return None if seconds is None else max(int(seconds * 1000), 1)
+
+
+def bounded(fn):
+    """
+    Async version of a blocking tool function. It runs in a worker thread (with the caller's
+    context, so the deadline, usage collector and trace carry over), so it no longer blocks the
+    server's event loop, and the caller stops waiting for it at the deadline.
+
+    A thread cannot be interrupted: a call still running at the deadline finishes in the
+    background (tools that loop, like `download_file`, stop at their next `check()`).
+    """
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        call = asyncio.to_thread(fn, *args, **kwargs)
+        left = remaining()
+        if left is None:
+            return await call
+        try:
+            return await asyncio.wait_for(call, timeout=max(left, 0))
+        except asyncio.TimeoutError:
+            raise DeadlineExceeded(f"{fn.__name__} did not finish before the deadline")
+
+    return wrapper
@@ -0,0 +1,244 @@
+"""
+Shared rate limiting and retries for Gemini and SerpAPI calls.
+
+Every model or API has a token bucket refilled at its quota (requests per minute). The
+bucket state lives in a small file under `.cache/ratelimit/` guarded by `fcntl.flock`,
+so concurrent evaluation runs, the ADK server and its tools all draw from the same bucket
+and together stay right at the quota. When a call still hits a 429 the bucket is paused
+for every process, and the call is retried with jittered exponential backoff.
+"""
+
+import contextlib
+import functools
+import json
+import os
+import random
+import re
+import threading
+import time
+from typing import Callable, TypeVar
+
+import httpx
+import requests
+from google.genai import errors as genai_errors
+
+from utils import cache, deadline
+
+try:
+    import fcntl
+except ImportError:  # Windows: buckets are only shared between threads of one process
+    fcntl = None
+
+T = TypeVar("T")
+
+# Requests per minute per model or API (Gemini paid tier 1 quotas)
+DEFAULT_QUOTAS = {
+    "gemini-2.5-pro": 150,
+    "gemini-2.5-flash": 1000,
+    "gemini-2.5-flash-lite": 4000,
+    "serpapi": 60,
+}
+DEFAULT_QUOTA = 60
+
+# Override quotas with e.g. RATE_LIMITS="gemini-2.5-pro=5,serpapi=20"
+QUOTAS = dict(DEFAULT_QUOTAS)
+QUOTAS.update(
+    (name.strip(), float(quota))
+    for name, _, quota in (item.partition("=") for item in os.getenv("RATE_LIMITS", "").split(",") if item)
+)
+
+# Seconds of quota that may be used at once after an idle period
+BURST_SECONDS = 5
+
+RETRY_ATTEMPTS = int(os.getenv("RETRY_ATTEMPTS", "5"))
+RETRY_BASE_DELAY = 1.0
+RETRY_MAX_DELAY = 60.0
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+RATE_LIMIT_DIR = os.path.join(cache.CACHE_DIR, "ratelimit")
+
+
+class RetryableError(Exception):
+    """A failed call that is worth retrying, e.g. an HTTP 429 or 503 from an API that does not raise itself."""
+
+    def __init__(self, message: str, status_code: int | None = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class TokenBucket:
+    """
+    Token bucket refilled at `rate_per_minute`, shared through `path` between processes.
+
+    Args:
+        name: Model or API name, used in messages
+        rate_per_minute: Quota in requests per minute
+        path: State file shared between processes (None = this process only)
+    """
+
+    def __init__(self, name: str, rate_per_minute: float, path: str | None = None):
+        self.name = name
+        self.rate = rate_per_minute / 60
+        self.capacity = max(1.0, self.rate * BURST_SECONDS)
+        self.path = path if fcntl is not None else None
+        self._lock = threading.Lock()
+        self._state = {"tokens": self.capacity, "updated": time.time(), "paused_until": 0.0}
+        if self.path:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+
+    @contextlib.contextmanager
+    def _locked_state(self):
+        """Yield the bucket state with exclusive access across threads and processes, then save it."""
+        with self._lock:
+            if self.path is None:
+                yield self._state
+                return
+            with os.fdopen(os.open(self.path, os.O_RDWR | os.O_CREAT), "r+") as f:
+                fcntl.flock(f, fcntl.LOCK_EX)
+                try:
+                    f.seek(0)
+                    content = f.read()
+                    state = json.loads(content) if content else dict(self._state)
+                    yield state
+                    f.seek(0)
+                    f.write(json.dumps(state))
+                    f.truncate()
+                finally:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    def acquire(self, max_wait: float | None = None) -> float:
+        """
+        Take one token, waiting until one is available.
+
+        Args:
+            max_wait: Longest wait in seconds (None = no limit), e.g. `max_wait()` for the question's deadline
+
+        Returns:
+            Seconds spent waiting
+
+        Raises:
+            DeadlineExceeded: If no token would be available within `max_wait` (checked before waiting,
+                so the time is not wasted)
+        """
+        waited = 0.0
+        while True:
+            with self._locked_state() as state:
+                now = time.time()
+                state["tokens"] = min(self.capacity, state["tokens"] + (now - state["updated"]) * self.rate)
+                state["updated"] = now
+                wait = state["paused_until"] - now
+                if wait <= 0 and state["tokens"] >= 1:
+                    state["tokens"] -= 1
+                    return waited
+                wait = max(wait, (1 - state["tokens"]) / self.rate)
+            if max_wait is not None and waited + wait > max_wait:
+                raise deadline.DeadlineExceeded(
+                    f"{self.name}: no request allowed by the rate limit within {max(max_wait - waited, 0):.1f}s")
+            time.sleep(wait)
+            waited += wait
+
+    def pause(self, seconds: float):
+        """Stop handing out tokens for `seconds` (after a 429), in every process."""
+        with self._locked_state() as state:
+            state["paused_until"] = max(state["paused_until"], time.time() + seconds)
+            state["tokens"] = min(state["tokens"], 0.0)
+
+
+def max_wait() -> float | None:
+    """
+    Longest a call may wait for the rate limit: until the question's answer reserve starts, after
+    which the agent must answer with what it has (None without a deadline).
+    """
+    left = deadline.remaining()
+    return None if left is None else left - deadline.ANSWER_RESERVE
+
+
+@functools.lru_cache(maxsize=None)
+def limiter(name: str) -> TokenBucket:
+    """The shared token bucket of a model or API."""
+    safe_name = re.sub(r"[^A-Za-z0-9_.-]", "_", name)
+    return TokenBucket(name, QUOTAS.get(name, DEFAULT_QUOTA), os.path.join(RATE_LIMIT_DIR, f"{safe_name}.json"))
+
+
+def status_code(error: Exception) -> int | None:
+    """HTTP status code of a failed call, if known."""
+    if isinstance(error, genai_errors.APIError):
+        return error.code
+    if isinstance(error, RetryableError):
+        return error.status_code
+    if isinstance(error, requests.HTTPError) and error.response is not None:
+        return error.response.status_code
+    return None
+
+
+def is_retryable(error: Exception) -> bool:
+    """Rate limits, server errors, timeouts and connection errors are retried; everything else fails fast."""
+    if isinstance(error, RetryableError):
+        return True
+    if isinstance(error, (requests.ConnectionError, requests.Timeout, httpx.TimeoutException, httpx.NetworkError)):
+        return True
+    return status_code(error) in RETRYABLE_STATUS_CODES
+
+
+def retry_after(error: Exception) -> float | None:
+    """Delay requested by the API (Gemini's RetryInfo, or a Retry-After header), in seconds."""
+    if isinstance(error, genai_errors.APIError) and isinstance(error.details, dict):
+        details = error.details.get("error", error.details).get("details", [])
+        for detail in details if isinstance(details, list) else []:
+            match = re.fullmatch(r"([\d.]+)s", str(detail.get("retryDelay", "")))
+            if match:
+                return float(match.group(1))
+    response = getattr(error, "response", None)
+    header = getattr(response, "headers", {}).get("Retry-After") if response is not None else None
+    if header and header.isdigit():
+        return float(header)
+    return None
+
+
+def backoff_delay(attempt: int, error: Exception | None = None) -> float:
+    """
+    Jittered exponential backoff ("full jitter"), or the API's requested delay plus jitter.
+
+    Args:
+        attempt: Number of the failed attempt, starting at 0
+        error: The error of the failed attempt
+    """
+    requested = retry_after(error) if error is not None else None
+    if requested is not None:
+        return min(requested, RETRY_MAX_DELAY) + random.uniform(0, RETRY_BASE_DELAY)
+    return random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** (attempt + 1)))
+
+
+def call(name: str, fn: Callable[..., T], *args, attempts: int | None = None, **kwargs) -> T:
+    """
+    Call `fn(*args, **kwargs)` within the rate limit of `name`, retrying retryable errors
+    as long as the retry can start before the question's deadline. Waits for the rate limit
+    end where the question's answer reserve starts (`DeadlineExceeded`).
+
+    Args:
+        name: Model or API whose quota the call uses, e.g. "gemini-2.5-flash" or "serpapi"
+        fn: The function making the call
+        attempts: Maximum number of attempts (default: RETRY_ATTEMPTS)
+
+    Returns:
+        The result of `fn`
+    """
+    attempts = attempts or RETRY_ATTEMPTS
+    bucket = limiter(name)
+    for attempt in range(attempts):
+        bucket.acquire(max_wait())
+        try:
+            return fn(*args, **kwargs)
+        except Exception as e:
+            if attempt == attempts - 1 or not is_retryable(e):
+                raise
+            delay = backoff_delay(attempt, e)
+            left = deadline.remaining()
+            if left is not None and delay >= left:
+                raise
+            if status_code(e) == 429:
+                # Other callers of the same quota back off too
+                bucket.pause(delay)
+            print(f"{name}: {type(e).__name__}: {e} (attempt {attempt + 1}/{attempts}, retrying in {delay:.1f}s)")
+            time.sleep(delay)
@@ -3,12 +3,48 @@ Google ADK Agent Runner using API Server.
 This module provides a function to run the ADK agent via HTTP requests to the API server.
 """
 import atexit
+import collections
+import concurrent.futures
+import dataclasses
+import hashlib
 import os
 import requests
 import subprocess
+import threading
 import time
 import uuid
 
+from utils import cache, deadline, tracing
+
+# Prefix for sessions created by the runner, used to find stale ones to expire
+SESSION_PREFIX = "eval_"
+
+# Seconds the runner waits past a question's deadline for the server's best-effort answer
+DEADLINE_GRACE = 5
+
+# Seconds between checks for leftover sessions older than the session TTL
+SESSION_EXPIRY_INTERVAL = 300
+
+# Settings that change the agent's answers; cached answers are scoped to their values (read from
+# the runner's environment, which the server it starts inherits)
+ANSWER_SETTINGS = (
+    "MODEL_CASCADE", "CASCADE_VERIFIER", "LOCAL_ROUTER", "ROUTER_MIN_CONFIDENCE",
+    "TOOL_OUTPUT_POLICY", "TOOL_OUTPUT_BUDGETS",
+)
+
+
+@dataclasses.dataclass
+class AgentRun:
+    """Result of a single agent run."""
+
+    text: str  # The agent's response text
+    session_id: str
+    events: list[dict]  # Raw events returned by the /run endpoint
+    state: dict  # Session state changes made during the run (merged state deltas)
+    cached: bool = False  # True if the answer was served from the answer cache
+    trace_file: str | None = None  # Chrome trace of the run, if tracing is enabled
+    timed_out: bool = False  # True if the deadline passed and the answer is best-effort (or missing)
+
 
 class ADKAgentRunner:
     """
@@ -16,13 +52,47 @@ class ADKAgentRunner:
     Automatically starts and manages the API server lifecycle.
     """
 
-    def __init__(self, base_url: str = "http://localhost:8000", agent_name: str = "my_agent", user_id: str = "dev_user"):
+    def __init__(
+        self,
+        base_url: str = "http://localhost:8000",
+        agent_name: str = "my_agent",
+        user_id: str = "dev_user",
+        keep_sessions: bool = False,
+        pool_size: int = 0,
+        session_ttl: float | None = 3600,
+        answer_cache: cache.PersistentCache | None = None,
+        trace_dir: str | None = None,
+        prefetch_attachments: bool = False,
+        question_timeout: float = 120,
+    ):
         self.base_url = base_url
         self.agent_name = agent_name
         self.user_id = user_id  # User ID for sessions (use same as web UI to see eval chats there)
+        self.keep_sessions = keep_sessions  # Keep finished sessions around (e.g. to inspect them in the web UI)
+        self.pool_size = pool_size  # Number of empty sessions kept ready for stateless questions
+        self.session_ttl = session_ttl  # Age (seconds) after which leftover eval sessions are expired
+        self.answer_cache = answer_cache  # Cache of answers keyed by question and attachment content
+        self.trace_dir = trace_dir  # Directory for per-question Chrome trace files (None = no tracing)
+        self.prefetch_attachments = prefetch_attachments  # Have the server extract attachments before the agent starts
+        self.question_timeout = question_timeout  # Default time budget (seconds) per question
+        # Cached answers are scoped to the agent's code (including the shared utils/ it runs) and
+        # settings, so editing the agent or switching e.g. MODEL_CASCADE invalidates them
+        settings = ",".join(f"{name}={os.getenv(name, '')}" for name in ANSWER_SETTINGS)
+        self._cache_namespace = (
+            f"{agent_name}:{cache.directory_fingerprint(os.path.join(os.getcwd(), agent_name))}"
+            f":{cache.directory_fingerprint(os.path.join(os.getcwd(), 'utils'))}"
+            f":{hashlib.sha256(settings.encode('utf-8')).hexdigest()[:16]}"
+        )
+        if prefetch_attachments:
+            self._cache_namespace += ":prefetch"
         self.server_process = None
-        self._session_counter = 0
+        self._session_counter = 0  # Sessions created, guarded by _pool_lock
+        self._last_expiry = time.monotonic()  # When leftover sessions were last expired
         self._we_started_server = False  # Track if we started the server
+        self._idle_sessions = collections.deque()
+        self._pool_lock = threading.Lock()
+        # Session cleanup and pool refills run here, off the question's critical path
+        self._housekeeper = concurrent.futures.ThreadPoolExecutor(max_workers=1)
 
     def _is_server_running(self) -> bool:
         """Check if an ADK API server is already running."""
@@ -93,27 +163,81 @@ class ADKAgentRunner:
         Returns:
             The agent's response
         """
+        return self.run(question, file_paths).text
+
+    def run(
+        self, question: str, file_paths: list[str] | None = None, use_cache: bool = True, timeout: float | None = None
+    ) -> AgentRun:
+        """
+        Run agent via REST API and return the response together with its events and state changes.
+
+        Args:
+            question: The question to answer
+            file_paths: Optional list of file paths (not yet fully implemented)
+            use_cache: Look up and store the answer in the answer cache (if configured)
+            timeout: Time budget in seconds (default: `question_timeout`). The server makes the agent
+                answer with what it has by then.
+
+        Returns:
+            AgentRun with the response text, raw events and merged state deltas
+        """
+        # The deadline travels to the server in session state, where tools size their timeouts by it
+        state_delta = {deadline.STATE_KEY: time.time() + (timeout or self.question_timeout)}
+        if self.trace_dir is None:
+            return self._run_cached(question, file_paths, use_cache, state_delta)
+
+        # The trace id travels to the server in session state; with the same TRACE_DIR its spans land in the same file
+        trace_id = f"{time.strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}"
+        state_delta[tracing.STATE_KEY] = trace_id
+        with tracing.trace(trace_id, self.trace_dir, "runner"):
+            with tracing.span("ADKAgentRunner.run_agent", question=question[:200], files=file_paths) as span:
+                agent_run = self._run_cached(question, file_paths, use_cache, state_delta)
+                span["cache_hit"] = agent_run.cached
+                span["response_chars"] = len(agent_run.text)
+        agent_run.trace_file = tracing.trace_path(trace_id, self.trace_dir)
+        return agent_run
+
+    def _run_cached(self, question: str, file_paths: list[str] | None, use_cache: bool, state_delta: dict) -> AgentRun:
+        """Serve the answer from the answer cache, or run the agent and cache its answer."""
+        cache_key = None
+        if use_cache and self.answer_cache is not None:
+            with tracing.span("answer cache lookup") as span:
+                try:
+                    cache_key = cache.answer_key(question, file_paths, namespace=self._cache_namespace)
+                except OSError:
+                    # An attachment is missing: leave it to the agent, as without the cache
+                    cached = None
+                else:
+                    cached = self.answer_cache.get(cache_key)
+                span["hit"] = cached is not None
+            if cached is not None:
+                return AgentRun(text=cached["text"], session_id="", events=[], state=cached["state"], cached=True)
+
+        agent_run = self._run(question, file_paths, state_delta)
+
+        # Empty and timed-out answers are usually failures, so they are retried next time instead of cached
+        if cache_key is not None and agent_run.text and not agent_run.timed_out:
+            self.answer_cache.set(cache_key, {"text": agent_run.text, "state": agent_run.state})
+
+        return agent_run
+
+    def _run(self, question: str, file_paths: list[str] | None = None, state_delta: dict | None = None) -> AgentRun:
+        """Run the agent in a fresh session."""
         # Ensure server is running (checks for existing server first)
         if self.server_process is None and not self._is_server_running():
             self.start_server()
 
-        # Generate unique session ID using UUID to avoid conflicts with existing sessions
-        # Using configured user_id (default: "dev_user")
-        # To see evaluation chats in web UI, use the same user_id as the web UI
-        # To find web UI's user_id: Open browser DevTools > Network tab > Check /run_sse request > Look for user_id in payload
-        session_id = f"eval_{uuid.uuid4().hex[:12]}"
-
-        # Create session
+        with tracing.span("acquire session"):
+            session_id = self._acquire_session()
         try:
-            session_response = requests.post(
-                f"{self.base_url}/apps/{self.agent_name}/users/{self.user_id}/sessions/{session_id}",
-                json={"state": {}},
-                timeout=10
-            )
-            session_response.raise_for_status()
-        except requests.exceptions.RequestException as e:
-            raise RuntimeError(f"Failed to create session for agent '{self.agent_name}': {e}") from e
+            return self._run_in_session(session_id, question, file_paths, state_delta)
+        finally:
+            self._release_session(session_id)
 
+    def _run_in_session(
+        self, session_id: str, question: str, file_paths: list[str] | None = None, state_delta: dict | None = None
+    ) -> AgentRun:
+        """Send a question to the agent in an existing session and collect the response text."""
         # Prepare message
         message_parts = [{"text": question}]
 
@@ -122,44 +246,233 @@ class ADKAgentRunner:
             # For now, just mention the files in the text
             file_info = f"\n\nNote: The following files are relevant: {', '.join(file_paths)}"
             message_parts[0]["text"] += file_info
+            if self.prefetch_attachments:
+                # Extracted concurrently by the server's AttachmentPrefetchPlugin before the agent starts
+                state_delta = {**(state_delta or {}), "attachments": file_paths}
+
+        # The server answers by the deadline; allow some slack for the response to arrive
+        question_deadline = (state_delta or {}).get(deadline.STATE_KEY)
+        http_timeout = max(question_deadline - time.time(), 0) + DEADLINE_GRACE if question_deadline else 120
 
         # Send message using /run endpoint
         try:
-            response = requests.post(
-                f"{self.base_url}/run",
-                json={
-                    "app_name": self.agent_name,
-                    "user_id": self.user_id,
-                    "session_id": session_id,
-                    "new_message": {
-                        "role": "user",
-                        "parts": message_parts
-                    }
-                },
-                timeout=120
-            )
+            with tracing.span("http POST /run", session_id=session_id) as span:
+                response = requests.post(
+                    f"{self.base_url}/run",
+                    json={
+                        "app_name": self.agent_name,
+                        "user_id": self.user_id,
+                        "session_id": session_id,
+                        "new_message": {
+                            "role": "user",
+                            "parts": message_parts
+                        },
+                        "state_delta": state_delta or None,
+                    },
+                    timeout=http_timeout
+                )
+                span["status"] = response.status_code
+                span["bytes"] = len(response.content)
             response.raise_for_status()
             events = response.json()
 
-            # Extract text from response events
+            # Extract text and state changes from response events
             response_text = ""
+            state = {}
             for event in events:
                 if "content" in event and event["content"]:
                     parts = event["content"].get("parts", [])
                     for part in parts:
                         if "text" in part:
                             response_text += part["text"]
+                state.update(event.get("actions", {}).get("stateDelta", {}))
 
-            return response_text.strip()
+            return AgentRun(
+                text=response_text.strip(), session_id=session_id, events=events, state=state,
+                timed_out=bool(state.get("deadline_exceeded")),
+            )
 
+        except requests.exceptions.Timeout:
+            # The server did not answer even after the deadline: no answer rather than a hang
+            return AgentRun(text="", session_id=session_id, events=[], state={}, timed_out=True)
         except requests.exceptions.RequestException as e:
             raise RuntimeError(f"Failed to run agent on question: {e}") from e
 
+    def _sessions_url(self, session_id: str | None = None) -> str:
+        url = f"{self.base_url}/apps/{self.agent_name}/users/{self.user_id}/sessions"
+        return f"{url}/{session_id}" if session_id else url
+
+    def _create_session(self) -> str:
+        """Create a new empty session on the server and return its ID."""
+        # Generate unique session ID using UUID to avoid conflicts with existing sessions
+        # Using configured user_id (default: "dev_user")
+        # To see evaluation chats in web UI, use the same user_id as the web UI
+        # To find web UI's user_id: Open browser DevTools > Network tab > Check /run_sse request > Look for user_id in payload
+        session_id = f"{SESSION_PREFIX}{uuid.uuid4().hex[:12]}"
+        try:
+            session_response = requests.post(
+                self._sessions_url(),
+                json={"session_id": session_id, "state": {}},
+                timeout=10
+            )
+            session_response.raise_for_status()
+        except requests.exceptions.RequestException as e:
+            raise RuntimeError(f"Failed to create session for agent '{self.agent_name}': {e}") from e
+        with self._pool_lock:
+            self._session_counter += 1
+        return session_id
+
+    def _delete_session(self, session_id: str) -> bool:
+        """Delete a session (and its event history) from the server."""
+        try:
+            response = requests.delete(self._sessions_url(session_id), timeout=10)
+            return response.status_code < 400
+        except requests.exceptions.RequestException:
+            return False
+
+    def _acquire_session(self) -> str:
+        """Take an empty session from the pool, or create one if the pool is empty."""
+        with self._pool_lock:
+            if self._idle_sessions:
+                return self._idle_sessions.popleft()
+        return self._create_session()
+
+    def _release_session(self, session_id: str):
+        """Hand a used session to the background housekeeper."""
+        self._housekeeper.submit(self._dispose_session, session_id)
+
+    def _dispose_session(self, session_id: str):
+        """
+        Dispose of a used session and top the pool back up.
+
+        A used session carries the previous question's event history, which would leak
+        into the next prompt, so it is deleted rather than handed out again; reuse happens
+        through the pool of pre-created empty sessions instead.
+        """
+        if not self.keep_sessions:
+            self._delete_session(session_id)
+
+        while True:
+            with self._pool_lock:
+                if len(self._idle_sessions) >= self.pool_size:
+                    break
+            try:
+                new_session = self._create_session()
+            except RuntimeError:
+                break
+            with self._pool_lock:
+                self._idle_sessions.append(new_session)
+
+        # Expire sessions left behind by crashed or interrupted runs every so often (only the
+        # housekeeper thread gets here, so _last_expiry needs no lock)
+        if self.session_ttl is not None and time.monotonic() - self._last_expiry >= SESSION_EXPIRY_INTERVAL:
+            self._last_expiry = time.monotonic()
+            self.expire_sessions(self.session_ttl)
+
+    def list_sessions(self) -> list[dict]:
+        """List the sessions the server holds for this app and user."""
+        response = requests.get(self._sessions_url(), timeout=10)
+        response.raise_for_status()
+        return response.json()
+
+    def expire_sessions(self, max_age: float) -> int:
+        """
+        Delete runner-created sessions that have not been updated for `max_age` seconds.
+
+        Returns:
+            The number of sessions deleted
+        """
+        try:
+            sessions = self.list_sessions()
+        except requests.exceptions.RequestException:
+            return 0
+
+        with self._pool_lock:
+            pooled = set(self._idle_sessions)
+
+        now = time.time()
+        expired = 0
+        for session in sessions:
+            session_id = session.get("id", "")
+            if not session_id.startswith(SESSION_PREFIX) or session_id in pooled:
+                continue
+            if now - session.get("lastUpdateTime", now) > max_age and self._delete_session(session_id):
+                expired += 1
+        return expired
+
+    def close_sessions(self):
+        """Delete all idle pooled sessions."""
+        with self._pool_lock:
+            pooled = list(self._idle_sessions)
+            self._idle_sessions.clear()
+        for session_id in pooled:
+            self._delete_session(session_id)
+
+    def flush_housekeeping(self):
+        """Wait until the session deletions and pool refills queued so far are done."""
+        self._housekeeper.submit(lambda: None).result()
+
+    def server_stats(self) -> dict:
+        """
+        Report server-side resource usage.
+
+        Returns:
+            Dict with the number of sessions held for this app/user and, when the server
+            was started by this runner on Linux, its resident memory in MB (otherwise None)
+        """
+        # Sessions released by the last question are deleted in the background; count after that
+        self.flush_housekeeping()
+        try:
+            session_count = len(self.list_sessions())
+        except requests.exceptions.RequestException:
+            session_count = None
+
+        rss_mb = None
+        if self.server_process is not None:
+            try:
+                with open(f"/proc/{self.server_process.pid}/status") as f:
+                    for line in f:
+                        if line.startswith("VmRSS:"):
+                            rss_mb = round(int(line.split()[1]) / 1024, 1)
+                            break
+            except OSError:
+                pass
+
+        return {"sessions": session_count, "rss_mb": rss_mb}
+
 
 # Global runner instance
 _runner = None
 
 
+def _get_runner(user_id: str = "dev_user") -> ADKAgentRunner:
+    """Create the global runner (and start the server) on first use."""
+    global _runner
+
+    if _runner is None:
+        answer_cache = None
+        if os.getenv("ANSWER_CACHE", "1") == "1":
+            answer_cache = cache.PersistentCache(
+                os.path.join(cache.CACHE_DIR, "answers.sqlite3"),
+                ttl=float(os.getenv("ANSWER_CACHE_TTL", str(7 * 24 * 3600))),
+            )
+            # Expired answers are never served, but only purging removes them from the file
+            answer_cache.purge_expired()
+        _runner = ADKAgentRunner(
+            user_id=user_id,
+            keep_sessions=os.getenv("KEEP_EVAL_SESSIONS", "") == "1",
+            pool_size=int(os.getenv("SESSION_POOL_SIZE", "0")),
+            answer_cache=answer_cache,
+            trace_dir=os.getenv("TRACE_DIR") or None,
+            prefetch_attachments=os.getenv("PREFETCH_ATTACHMENTS", "") == "1",
+            question_timeout=float(os.getenv("QUESTION_TIMEOUT", "120")),
+        )
+        _runner.start_server()
+        atexit.register(_runner.close_sessions)
+
+    return _runner
+
+
 def run_agent(question: str, file_paths: list[str] | None = None, user_id: str = "dev_user") -> str:
     """
     Run the Google ADK agent on a given question.
@@ -173,10 +486,32 @@ def run_agent(question: str, file_paths: list[str] | None = None, user_id: str =
     Returns:
         The agent's response as a string
     """
-    global _runner
+    return _get_runner(user_id).run_agent(question, file_paths)
 
-    if _runner is None:
-        _runner = ADKAgentRunner(user_id=user_id)
-        _runner.start_server()
 
-    return _runner.run_agent(question, file_paths)
+def run(question: str, file_paths: list[str] | None = None, user_id: str = "dev_user", use_cache: bool = True) -> AgentRun:
+    """
+    Run the Google ADK agent on a given question, keeping the events and state changes.
+    See `run_agent` for the other arguments.
+
+    Args:
+        use_cache: Serve and store the answer through the answer cache (disable with ANSWER_CACHE=0)
+
+    Returns:
+        AgentRun with the response text, raw events and merged state deltas
+    """
+    return _get_runner(user_id).run(question, file_paths, use_cache=use_cache)
+
+
+def cache_stats(user_id: str = "dev_user") -> dict | None:
+    """Hit/miss counters of the answer cache, or None if it is disabled."""
+    runner = _get_runner(user_id)
+    return runner.answer_cache.stats() if runner.answer_cache is not None else None
+
+
+def server_stats(user_id: str = "dev_user") -> dict:
+    """
+    Report the ADK server's session count and memory usage (see `ADKAgentRunner.server_stats`).
+    """
+    return _get_runner(user_id).server_stats()
+
@@ -0,0 +1,96 @@
+"""
+Descriptive statistics and significance helpers for evaluation summaries and comparisons.
+"""
+
+import math
+import random
+from typing import Callable
+
+
+def percentile(values: list[float], q: float) -> float:
+    """q-th percentile (0-100) of the values, with linear interpolation."""
+    if not values:
+        return 0
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def distribution(values: list[float], digits: int = 2) -> dict:
+    """Mean, median, tail percentiles and maximum of the values."""
+    if not values:
+        return {"mean": 0, "p50": 0, "p90": 0, "p99": 0, "max": 0}
+    return {
+        "mean": round(sum(values) / len(values), digits),
+        "p50": round(percentile(values, 50), digits),
+        "p90": round(percentile(values, 90), digits),
+        "p99": round(percentile(values, 99), digits),
+        "max": round(max(values), digits),
+    }
+
+
+def mean(values: list[float]) -> float:
+    return sum(values) / len(values) if values else 0
+
+
+def median(values: list[float]) -> float:
+    return percentile(values, 50)
+
+
+def bootstrap_ci(
+    values: list[float],
+    statistic: Callable[[list[float]], float] = mean,
+    confidence: float = 0.95,
+    resamples: int = 2000,
+    seed: int = 0,
+) -> tuple[float, float]:
+    """
+    Percentile bootstrap confidence interval of a statistic of one sample
+    (e.g. the mean of paired per-question differences).
+    """
+    if len(values) < 2:
+        value = statistic(values)
+        return value, value
+    rng = random.Random(seed)
+    estimates = [statistic(rng.choices(values, k=len(values))) for _ in range(resamples)]
+    tail = (1 - confidence) / 2 * 100
+    return percentile(estimates, tail), percentile(estimates, 100 - tail)
+
+
+def bootstrap_diff_ci(
+    baseline: list[float],
+    candidate: list[float],
+    statistic: Callable[[list[float]], float] = median,
+    confidence: float = 0.95,
+    resamples: int = 2000,
+    seed: int = 0,
+) -> tuple[float, float]:
+    """
+    Percentile bootstrap confidence interval of `statistic(candidate) - statistic(baseline)`
+    for two independent samples (e.g. repeated latencies of one question in two runs).
+    """
+    if len(baseline) < 2 or len(candidate) < 2:
+        value = statistic(candidate) - statistic(baseline)
+        return value, value
+    rng = random.Random(seed)
+    estimates = [
+        statistic(rng.choices(candidate, k=len(candidate))) - statistic(rng.choices(baseline, k=len(baseline)))
+        for _ in range(resamples)
+    ]
+    tail = (1 - confidence) / 2 * 100
+    return percentile(estimates, tail), percentile(estimates, 100 - tail)
+
+
+def mcnemar_p(only_baseline: int, only_candidate: int) -> float:
+    """
+    Exact two-sided McNemar test p-value for paired binary outcomes, e.g. questions
+    answered correctly only by the baseline vs only by the candidate.
+    """
+    n = only_baseline + only_candidate
+    if n == 0:
+        return 1.0
+    k = min(only_baseline, only_candidate)
+    tail = sum(math.comb(n, i) for i in range(k + 1)) / 2 ** n
+    return min(1.0, 2 * tail)
@@ -0,0 +1,133 @@
+"""
+Lightweight tracing with Chrome trace output.
+
+Spans are appended as Chrome trace "complete" events to one file per question,
+`<trace dir>/<trace id>.json`. The runner and the ADK server write to the same file
+(the trace id travels to the server in session state; both take the directory from
+TRACE_DIR), so a single file shows the whole question. Open it in https://ui.perfetto.dev
+or chrome://tracing.
+"""
+import contextlib
+import contextvars
+import json
+import os
+import re
+import threading
+import time
+
+# Session state key carrying the trace id from the runner to the server
+STATE_KEY = "trace"
+
+# Trace directory of the server (None = the server does not trace). It is never taken from
+# session state, so clients cannot make the server write files elsewhere.
+TRACE_DIR = os.getenv("TRACE_DIR") or None
+
+# Trace ids become file names, so only plain ids are accepted from clients
+TRACE_ID_PATTERN = re.compile(r"[A-Za-z0-9_-]{1,64}")
+
+_current = contextvars.ContextVar("trace_file", default=None)
+_write_lock = threading.Lock()
+_named_processes = set()
+
+
+def _now_us() -> float:
+    return time.time() * 1e6
+
+
+def _write(path: str, event: dict):
+    # The file is a JSON array whose closing bracket is optional in the Chrome trace
+    # format, so events from several processes can simply be appended
+    line = json.dumps(event, default=str) + ",\n"
+    with _write_lock:
+        with open(path, "a") as f:
+            if f.tell() == 0:
+                f.write("[\n")
+            f.write(line)
+
+
+def is_valid_trace_id(trace_id) -> bool:
+    return isinstance(trace_id, str) and TRACE_ID_PATTERN.fullmatch(trace_id) is not None
+
+
+def trace_path(trace_id: str, trace_dir: str) -> str:
+    return os.path.join(os.path.abspath(trace_dir), f"{trace_id}.json")
+
+
+def start(trace_id: str, trace_dir: str, process_name: str | None = None) -> contextvars.Token:
+    """
+    Make spans in the current context go to the trace file of `trace_id`.
+
+    Returns:
+        Token to pass to `stop`
+    """
+    os.makedirs(trace_dir, exist_ok=True)
+    path = trace_path(trace_id, trace_dir)
+    if process_name and (path, os.getpid()) not in _named_processes:
+        _named_processes.add((path, os.getpid()))
+        _write(path, {"name": "process_name", "ph": "M", "pid": os.getpid(), "args": {"name": process_name}})
+    return _current.set(path)
+
+
+def stop(token: contextvars.Token):
+    """Stop tracing in the current context."""
+    _current.reset(token)
+
+
+def active() -> bool:
+    return _current.get() is not None
+
+
+@contextlib.contextmanager
+def trace(trace_id: str, trace_dir: str, process_name: str | None = None):
+    """Context manager form of `start`/`stop`."""
+    token = start(trace_id, trace_dir, process_name)
+    try:
+        yield
+    finally:
+        stop(token)
+
+
+def begin_span(name: str, **attributes) -> dict | None:
+    """
+    Open a span that is closed later with `end_span` (e.g. in a different callback).
+
+    Returns:
+        Span handle, or None when no trace is active
+    """
+    path = _current.get()
+    if path is None:
+        return None
+    return {"path": path, "name": name, "start": _now_us(), "args": attributes}
+
+
+def end_span(span: dict | None, **attributes):
+    """Close a span opened with `begin_span`, adding attributes."""
+    if span is None:
+        return
+    span["args"].update(attributes)
+    _write(span["path"], {
+        "name": span["name"],
+        "ph": "X",
+        "ts": span["start"],
+        "dur": _now_us() - span["start"],
+        "pid": os.getpid(),
+        "tid": threading.get_ident(),
+        "args": span["args"],
+    })
+
+
+@contextlib.contextmanager
+def span(name: str, **attributes):
+    """
+    Record the block as a span. Yields the attribute dict, so attributes known only
+    later (bytes, status, cache hit) can be added inside the block.
+    """
+    handle = begin_span(name, **attributes)
+    args = handle["args"] if handle else {}
+    try:
+        yield args
+    except BaseException as e:
+        args["error"] = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        end_span(handle)
@@ -0,0 +1,142 @@
+"""
+Token usage accounting for Gemini calls.
+
+Model calls made inside tools are recorded into a per-tool-call collector (see
+`my_agent/plugins.py`), which stores them in session state under "usage:<call id>".
+Model calls made by the agents themselves are read from the `usageMetadata` of the
+returned events. `run_records` combines both into one list of usage records.
+"""
+import contextlib
+import contextvars
+
+TOKEN_FIELDS = ("prompt_tokens", "output_tokens", "thoughts_tokens", "total_tokens")
+
+# Session state keys holding usage records start with this prefix
+STATE_PREFIX = "usage:"
+
+_records = contextvars.ContextVar("usage_records", default=None)
+
+
+def tokens_from_metadata(metadata) -> dict:
+    """
+    Token counts from Gemini usage metadata, given either as a `UsageMetadata` object or as
+    the camelCase dict found in serialized events.
+    """
+    if metadata is None:
+        return {field: 0 for field in TOKEN_FIELDS}
+    if not isinstance(metadata, dict):
+        metadata = {
+            "promptTokenCount": metadata.prompt_token_count,
+            "candidatesTokenCount": metadata.candidates_token_count,
+            "thoughtsTokenCount": metadata.thoughts_token_count,
+            "totalTokenCount": metadata.total_token_count,
+        }
+    return {
+        "prompt_tokens": metadata.get("promptTokenCount") or 0,
+        "output_tokens": metadata.get("candidatesTokenCount") or 0,
+        "thoughts_tokens": metadata.get("thoughtsTokenCount") or 0,
+        "total_tokens": metadata.get("totalTokenCount") or 0,
+    }
+
+
+def record(response, model: str, source: str):
+    """
+    Record the usage of a `generate_content` response into the active collector (if any).
+
+    Args:
+        response: The Gemini response
+        model: The model that was called
+        source: The function that made the call, e.g. "web_search.extract"
+    """
+    records = _records.get()
+    if records is not None:
+        records.append({"source": source, "model": model, **tokens_from_metadata(getattr(response, "usage_metadata", None))})
+
+
+def begin():
+    """Start collecting usage records in the current context."""
+    _records.set([])
+
+
+def end() -> list[dict]:
+    """Stop collecting and return the records collected since `begin`."""
+    records = _records.get() or []
+    _records.set(None)
+    return records
+
+
+@contextlib.contextmanager
+def collect():
+    """Context manager collecting usage records made inside the block into the yielded list."""
+    records = []
+    token = _records.set(records)
+    try:
+        yield records
+    finally:
+        _records.reset(token)
+
+
+def event_records(events: list, model: str | None = None) -> list[dict]:
+    """
+    Usage records of the agents' own model calls, from events (objects or serialized dicts).
+
+    Args:
+        events: The events of an agent run
+        model: The model that produced the events, if known (events do not record it)
+    """
+    records = []
+    for event in events:
+        if isinstance(event, dict):
+            author, metadata = event.get("author"), event.get("usageMetadata")
+        else:
+            author, metadata = event.author, event.usage_metadata
+        if metadata:
+            records.append({"agent": author, "tool": None, "source": "model", "model": model, **tokens_from_metadata(metadata)})
+    return records
+
+
+def state_records(state: dict) -> list[dict]:
+    """Usage records stored in session state by tool calls."""
+    records = []
+    for key, value in state.items():
+        if key.startswith(STATE_PREFIX) and isinstance(value, list):
+            records.extend(value)
+    return records
+
+
+def run_records(events: list, state: dict) -> list[dict]:
+    """All usage records of an agent run."""
+    return event_records(events) + state_records(state)
+
+
+def _add(total: dict, record: dict):
+    for field in TOKEN_FIELDS:
+        total[field] = total.get(field, 0) + record.get(field, 0)
+
+
+def summarize(records: list[dict]) -> dict:
+    """
+    Aggregate usage records.
+
+    Returns:
+        Dict with total token counts, number of model calls, and token counts by agent and by tool
+    """
+    summary = {"total": {field: 0 for field in TOKEN_FIELDS}, "calls": len(records), "by_agent": {}, "by_tool": {}}
+    for r in records:
+        _add(summary["total"], r)
+        _add(summary["by_agent"].setdefault(r.get("agent") or "unknown", {}), r)
+        if r.get("tool"):
+            _add(summary["by_tool"].setdefault(r["tool"], {}), r)
+    return summary
+
+
+def merge(summaries: list[dict]) -> dict:
+    """Combine several `summarize` results into one."""
+    merged = {"total": {field: 0 for field in TOKEN_FIELDS}, "calls": 0, "by_agent": {}, "by_tool": {}}
+    for summary in summaries:
+        _add(merged["total"], summary["total"])
+        merged["calls"] += summary["calls"]
+        for group in ("by_agent", "by_tool"):
+            for name, tokens in summary[group].items():
+                _add(merged[group].setdefault(name, {}), tokens)
+    return merged